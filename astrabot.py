@@ -1,95 +1,160 @@
 import os
-import time
 import datetime
 import webbrowser
-import io
-import base64
+import hashlib
+import uuid
+import re
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import streamlit as st
-import requests  # For web search and API calls
+from quotes import parse_symbols, refresh_watchlist, watchlist_frame  # Concurrent, rate-limited stock quotes
+from web_search import web_search, search_cache, search_totals  # Concurrent multi-provider search with a result cache
+from http_client import fetch_json, format_http_stats  # Pooled, retrying, cached HTTP for web APIs
 import google.generativeai as genai
-import difflib  # For document comparison
 from config import GEMINI_API_KEY, FINHUB_API_KEY, WEATHER_API_KEY, NEWS_API_KEY
 from docx import Document
-import fitz  # PyMuPDF for PDF files
 import pandas as pd
 import speech_recognition as sr
-from pydub import AudioSegment
-from gtts import gTTS  # For text-to-speech conversion
+from tts import iter_clips, audio_url, play_audio_with_delay, tts_cache, audio_store  # Sentence-chunked, concurrent, cached gTTS
 import streamlit.components.v1 as components
-from fpdf import FPDF  # For PDF generation
-from youtube_transcript_api import YouTubeTranscriptApi  # For YouTube transcripts
-from urllib.parse import urlparse, parse_qs
-from PIL import Image  # For image processing
-import pytesseract  # For OCR
 from textblob import TextBlob  # For NLP analysis
 from streamlit_quill import st_quill  # Rich text editor component
+from file_index import FileIndex  # Persistent filename index
+from response_cache import response_cache, get_cached_response, cache_response
+from pdf_text import pdf_source, pdf_page_count, iter_pdf_pages, ocr_totals  # Page-streaming PDF extraction
+from doc_diff import diff_documents  # Patience diff over hashed lines/paragraphs
+from ttl_cache import TTLCache
+from speech import (  # Chunked transcription with online or offline recognizers
+    SPEECH_BACKENDS, SPEECH_BACKEND_LOCAL, transcribe, get_recognizer, local_backend_error, warm_local_backend,
+)
+from youtube import extract_youtube_id, fetch_transcript, get_cached_summary, cache_summary  # Cached transcripts
+from transcript_summary import summarize_segments  # Map-reduce summaries of long transcripts
+from ocr import ocr_cache, ocr_file, batch_ocr  # Preprocessed, concurrent, hash-cached Tesseract OCR
+from converters import (  # Worker-safe conversion helpers
+    CONVERSIONS, text_to_pdf, text_to_docx, csv_to_excel, excel_to_csv, excel_sheet_names,
+    output_name, list_convertible_files, batch_convert,
+)
 
 # --- Configure Gemini API ---
 genai.configure(api_key=GEMINI_API_KEY)
+GEMINI_MODEL = "gemini-2.0-flash"
 
-# --- DuckDuckGo Smart Web Search Helper ---
+# --- File Index Settings ---
+FILE_INDEX_ROOTS = ["C:\\"]  # Folders searched by "list files" / "extract data" queries
+FILE_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".astra_file_index.db")
+FILE_INDEX_MAX_AGE = 300  # Seconds before a background mtime rescan is scheduled
+
+# --- Contextual Insights Settings ---
+INSIGHTS_TIMEOUT = 5  # Seconds to wait for insights after the main answer before deferring them
+INSIGHTS_WORKERS = 4
+DIGEST_ENTRY_CHARS = 300       # Per-message cap in the conversation digest
+DIGEST_MAX_ENTRIES = 40        # Older digest entries are dropped beyond this
+LAST_EXCHANGE_CHARS = 4000     # Per-message cap for the latest exchange in the insights prompt
+
+# --- Entity Extraction Settings ---
+ENTITY_LOCAL_MIN_CONFIDENCE = 0.75  # Below this the local parser defers to Gemini
+EXTRACT_MAX_PAGES = 50  # PDF pages shown by "extract data" queries
+ENTITY_FILLER_WORDS = {"my", "the", "a", "this", "that", "folder", "directory", "dir", "file", "please", "called", "named"}
+ENTITY_NAME_STOP_WORDS = ENTITY_FILLER_WORDS | {"in", "from", "inside", "under", "within", "of", "for", "and",
+                                                "data", "extract", "get", "read", "open", "show", "list", "files"}
+ENTITY_NAME_MAX_WORDS = 4  # Words before an extension match that may belong to the file name
+
+# --- CSV Reading Settings ---
+CSV_CHUNK_ROWS = 50000      # Rows parsed per chunk; bounds memory for large files
+CSV_PREVIEW_ROWS = 20       # Rows shown in the summary preview
+CSV_DISTINCT_LIMIT = 1000   # Distinct values tracked per text column before reporting "1000+"
+
+# --- Document Comparison Settings ---
+DIFF_HUNKS_PER_PAGE = 25
+
+# --- Parsed Upload Cache Settings ---
+PARSER_VERSION = 2                        # Bump when a reader's output changes to invalidate cached parses
+PARSE_CACHE_MAX_BYTES = 256 * 1024 * 1024  # Memory tier budget (characters of parsed text)
+PARSE_CACHE_PATH = None                   # e.g. os.path.join(os.path.expanduser("~"), ".astra_parse_cache.db")
+
+# --- Smart Web Search Helper ---
 def perform_duckduckgo_search(query):
-    """Fetch quick results from DuckDuckGo Instant Answer API."""
+    """Searches DuckDuckGo and the other web_search providers concurrently; returns the results as text."""
     try:
-        url = f"https://api.duckduckgo.com/?q={query}&format=json&no_html=1&skip_disambig=1"
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("AbstractText"):
-                return data["AbstractText"]
-            else:
-                return "No instant answer available."
-        else:
-            return "Error fetching search results."
+        results = web_search(query)
     except Exception as e:
         return f"Search error: {str(e)}"
+    if not results:
+        return "No results found."
+    return "\n\n".join(f"{res['title']}\n{res['url']}\n{res['snippet']}" for res in results)
 
 # --- YouTube Transcript and Summarization Helpers ---
-def extract_youtube_id(url):
-    """Extracts the YouTube video ID from a URL."""
-    parsed_url = urlparse(url)
-    if parsed_url.hostname in ['youtu.be']:
-        return parsed_url.path[1:]
-    elif parsed_url.hostname in ['www.youtube.com', 'youtube.com']:
-        if parsed_url.path == '/watch':
-            query = parse_qs(parsed_url.query)
-            return query.get('v', [None])[0]
-        elif parsed_url.path.startswith('/embed/'):
-            return parsed_url.path.split('/')[2]
-        elif parsed_url.path.startswith('/v/'):
-            return parsed_url.path.split('/')[2]
-    return None
-
-def get_youtube_transcript(video_url):
-    """Fetches the transcript for a given YouTube video URL."""
+def get_youtube_segments(video_url):
+    """Fetches the timestamped transcript segments ({"text", "start", "duration"}) of a video."""
     video_id = extract_youtube_id(video_url)
     if not video_id:
         st.error("Invalid YouTube URL")
         return None
     try:
-        transcript_data = YouTubeTranscriptApi.get_transcript(video_id)
-        transcript = " ".join([segment['text'] for segment in transcript_data])
-        return transcript
+        return fetch_transcript(video_id)
     except Exception as e:
         st.error(f"Error fetching transcript: {e}")
         return None
 
-def summarize_transcript(transcript):
-    """Summarizes a YouTube transcript using a chat-based prompt."""
-    prompt = f"Summarize the following YouTube video transcript into key points:\n\n{transcript}\n\nSummary:"
-    return chat(prompt)
+def get_youtube_transcript(video_url):
+    """Fetches the transcript for a given YouTube video URL."""
+    segments = get_youtube_segments(video_url)
+    if segments is None:
+        return None
+    return " ".join(segment['text'] for segment in segments)
+
+def summarize_transcript(segments, on_partial=None):
+    """
+    Summarizes transcript segments map-reduce style: timestamped chunks are summarized
+    concurrently (reported through on_partial as they finish), then merged.
+    """
+    try:
+        return summarize_segments(segments, generate_text, on_partial=on_partial)
+    except Exception as e:
+        st.error(f"Error summarizing transcript: {e}")
+        return None
+
+def summarize_video(video_url, on_partial=None):
+    """Returns the video's summary, reusing a stored one so repeat URLs need no network or LLM calls."""
+    video_id = extract_youtube_id(video_url)
+    summary = get_cached_summary(video_id) if video_id else None
+    if summary is not None:
+        return summary
+    segments = get_youtube_segments(video_url)
+    if not segments:
+        return None
+    summary = summarize_transcript(segments, on_partial=on_partial)
+    if summary:
+        cache_summary(video_id, summary)
+    return summary
 
 # --- Image Text Extraction Helper ---
 def extract_text_from_image(image_file):
-    """Extracts text from an image file using pytesseract OCR."""
+    """Extracts text from an image file (every page of a multi-page TIFF) using cached OCR."""
     try:
-        image = Image.open(image_file)
-        text = pytesseract.image_to_string(image)
-        return text
+        return ocr_file(image_file)
     except Exception as e:
         st.error(f"Error extracting text: {e}")
         return None
 
+def run_batch_ocr(image_files):
+    """
+    OCRs uploaded images concurrently, showing per-file progress. Returns a list of
+    (file name, text) in upload order and a list of (file name, error).
+    """
+    progress = st.progress(0.0, text=f"Reading {len(image_files)} images...")
+    texts, failures = {}, []
+    jobs = list(enumerate(image_files))
+    for done, (index, text, error) in enumerate(batch_ocr(jobs), start=1):
+        name = image_files[index].name
+        if error:
+            failures.append((name, error))
+        else:
+            texts[index] = text
+        progress.progress(done / len(jobs), text=f"Read {done} of {len(jobs)} images")
+    return [(image_files[index].name, texts[index]) for index in sorted(texts)], failures
+
 # --- Advanced NLP Analysis Helper ---
 def advanced_nlp_analysis(text):
     """
@@ -103,11 +168,80 @@ def advanced_nlp_analysis(text):
     return sentiment, keywords, summary
 
 # --- New Helper Function for Entity Extraction ---
+def extract_entity_local(query):
+    """
+    Parses a folder/file name from common query shapes without calling Gemini.
+    Returns (name, confidence); name is None when no pattern matched.
+    """
+    # Quoted names: list files in "My Projects"
+    match = re.search(r'["“]([^"“”]+)["”]|(?<!\w)[\'‘]([^\'‘’]+)[\'’](?!\w)', query)
+    if match and (match.group(1) or match.group(2)).strip():
+        return (match.group(1) or match.group(2)).strip(), 1.0
+    # Absolute paths: C:\Users\me\Documents or /home/me/docs
+    match = re.search(r'([A-Za-z]:[\\/][^\s"\']*|(?<!\w)/[^\s"\']+)', query)
+    if match:
+        path = match.group(1).rstrip("?!,;:.")
+        rest = query[match.end():].rstrip("?!,;:.")
+        if not rest.strip():
+            return path, 0.95
+        # Unquoted paths can contain spaces (C:\My Projects): take the rest of the query
+        # when that names something on disk, otherwise let Gemini decide where it ends
+        if os.path.exists(match.group(1) + rest):
+            return match.group(1) + rest, 0.95
+        return path, 0.5
+    # Names with an extension: report.pdf, data_2024.csv
+    match = re.search(r'(?<![\w.])([\w\-]+(?:\.[\w\-]+)*\.[A-Za-z][A-Za-z0-9]{0,4})(?!\w|\.\w)', query)
+    if match:
+        # Unquoted names can contain spaces (budget 2024.xlsx): words after the last filler
+        # word may belong to the name, so prefer the longest candidate the file index knows
+        preceding = []
+        for word in reversed(query[:match.start()].split()[-ENTITY_NAME_MAX_WORDS:]):
+            if word.lower() in ENTITY_NAME_STOP_WORDS:
+                break
+            preceding.insert(0, word)
+        if not preceding:
+            return match.group(1), 0.9
+        for count in range(len(preceding), -1, -1):
+            candidate = " ".join(preceding[len(preceding) - count:] + [match.group(1)])
+            if indexed_file_exists(candidate):
+                return candidate, 0.9
+        return " ".join(preceding + [match.group(1)]), 0.5
+    # Trailing "in/from <name>": list files in Documents
+    match = re.search(r'\b(?:in|from|inside|under|within|of)\s+(.+)$', query, flags=re.IGNORECASE)
+    if match:
+        words = match.group(1).rstrip("?!,;:.").split()
+        # Filler words are only dropped in lower case so names like "New Folder" survive
+        kept = [w for w in words if w not in ENTITY_FILLER_WORDS]
+        if len(kept) == 1:
+            return kept[0], 0.8
+        if kept:
+            return " ".join(kept), 0.5
+    return None, 0.0
+
+def indexed_file_exists(name):
+    """True if the filename index (once ready) holds a file with this exact name."""
+    index = get_file_index()
+    return index.is_ready() and bool(index.find(name, is_dir=False))
+
+@st.cache_resource
+def get_entity_stats():
+    """Process-wide counts of entity extractions served locally vs. by Gemini."""
+    return {"local": 0, "llm": 0}
+
 def extract_entity(query, instruction):
-    """Uses Gemini to extract folder/file names from natural language queries."""
+    """
+    Extracts folder/file names from natural language queries, trying the local parser
+    first and only asking Gemini when it is not confident.
+    """
+    stats = get_entity_stats()
+    name, confidence = extract_entity_local(query)
+    if name and confidence >= ENTITY_LOCAL_MIN_CONFIDENCE:
+        stats["local"] += 1
+        return name
+    stats["llm"] += 1
     try:
         prompt = f"{instruction}\nQuery: {query}\nExtracted name:"
-        model = genai.GenerativeModel("gemini-2.0-flash")
+        model = genai.GenerativeModel(GEMINI_MODEL)
         response = model.generate_content(prompt)
         cleaned_response = response.text.strip().strip('"').strip("'").split('\n')[0]
         return cleaned_response
@@ -132,18 +266,27 @@ def read_docx_file(file_path_or_buffer):
         st.error(f"Error reading DOCX file: {e}")
         return None
 
-def read_pdf_file(file_path_or_buffer):
+def format_ocr_stats(ocr_stats):
+    """One-line summary of the scanned pages behind a read, or None if none were OCR'd."""
+    if not ocr_stats:
+        return None
+    return (
+        f"Scanned pages: {ocr_stats.get('pages', 0)} OCR'd in {ocr_stats.get('seconds', 0.0):.1f}s of "
+        f"OCR time, {ocr_stats.get('cached', 0)} from cache"
+        + (f", {ocr_stats['failed']} failed (text layer used)" if ocr_stats.get("failed") else "")
+    )
+
+def read_pdf_file(file_path_or_buffer, max_pages=None, page_range=None, ocr_stats=None):
+    """OCR counts for scanned pages are added to ocr_stats (if given) for the caller to show."""
     try:
-        if hasattr(file_path_or_buffer, "read"):
-            file_bytes = file_path_or_buffer.read()
-            doc = fitz.open(stream=file_bytes, filetype="pdf")
-        else:
-            doc = fitz.open(file_path_or_buffer)
-        content = []
-        for page_num in range(doc.page_count):
-            page = doc.load_page(page_num)
-            content.append(page.get_text())
-        return '\n'.join(content)
+        source = pdf_source(file_path_or_buffer)
+        content = list(iter_pdf_pages(source, page_range=page_range, max_pages=max_pages, stats=ocr_stats))
+        text = '\n'.join(content)
+        if max_pages is not None and not page_range:
+            remaining = pdf_page_count(source) - len(content)
+            if remaining > 0:
+                text += f"\n\n[... {remaining} more pages not shown]"
+        return text
     except Exception as e:
         st.error(f"Error reading PDF file: {e}")
         return None
@@ -159,38 +302,140 @@ def read_txt_file(file_path_or_buffer):
         st.error(f"Error reading TXT file: {e}")
         return None
 
-def read_csv_file(file_path_or_buffer):
-    try:
-        if hasattr(file_path_or_buffer, "read"):
-            df = pd.read_csv(file_path_or_buffer)
+def iter_csv_chunks(file_path_or_buffer, usecols=None, chunksize=CSV_CHUNK_ROWS):
+    """Yields the CSV as DataFrame chunks, for consumers that need every row."""
+    if hasattr(file_path_or_buffer, "seek"):
+        file_path_or_buffer.seek(0)
+    with pd.read_csv(file_path_or_buffer, usecols=usecols, chunksize=chunksize) as reader:
+        for chunk in reader:
+            yield chunk
+
+def summarize_csv(file_path_or_buffer, usecols=None, preview_rows=CSV_PREVIEW_ROWS):
+    """
+    Reads a CSV chunk by chunk and returns a text summary: row count, schema,
+    per-column statistics and a bounded preview of the first rows.
+    """
+    row_count = 0
+    preview = None
+    stats = {}
+    for chunk in iter_csv_chunks(file_path_or_buffer, usecols=usecols):
+        if preview is None:
+            preview = chunk.head(preview_rows)
+        row_count += len(chunk)
+        for column in chunk.columns:
+            series = chunk[column]
+            col_stats = stats.setdefault(column, {
+                "dtype": str(series.dtype), "non_null": 0, "numeric": True,
+                "min": None, "max": None, "sum": 0.0, "distinct": set(),
+            })
+            col_stats["non_null"] += int(series.count())
+            values = series.dropna()
+            if col_stats["numeric"] and pd.api.types.is_numeric_dtype(series):
+                if len(values):
+                    low, high = values.min(), values.max()
+                    col_stats["min"] = low if col_stats["min"] is None else min(col_stats["min"], low)
+                    col_stats["max"] = high if col_stats["max"] is None else max(col_stats["max"], high)
+                    col_stats["sum"] += float(values.sum())
+            else:
+                col_stats["numeric"] = False
+                col_stats["dtype"] = str(series.dtype)
+                if len(col_stats["distinct"]) <= CSV_DISTINCT_LIMIT:
+                    col_stats["distinct"].update(values.unique()[:CSV_DISTINCT_LIMIT + 1])
+
+    if preview is None:
+        return "CSV summary: 0 rows"
+    lines = [f"CSV summary: {row_count:,} rows x {len(stats)} columns", "", "Columns:"]
+    for column, col_stats in stats.items():
+        line = f"- {column} ({col_stats['dtype']}): {col_stats['non_null']:,} non-null"
+        if col_stats["numeric"]:
+            if col_stats["non_null"]:
+                mean = col_stats["sum"] / col_stats["non_null"]
+                line += f", min {col_stats['min']}, max {col_stats['max']}, mean {mean:.4g}"
         else:
-            df = pd.read_csv(file_path_or_buffer)
-        return df.to_string()
+            distinct = len(col_stats["distinct"])
+            line += f", {CSV_DISTINCT_LIMIT}+ distinct values" if distinct > CSV_DISTINCT_LIMIT else f", {distinct} distinct values"
+        lines.append(line)
+    lines += ["", f"Preview (first {len(preview)} rows):", preview.to_string()]
+    return "\n".join(lines)
+
+def read_csv_rows_text(file_path_or_buffer):
+    """Returns every row as CSV text, built chunk by chunk (used for line diffs)."""
+    parts = []
+    for index, chunk in enumerate(iter_csv_chunks(file_path_or_buffer)):
+        parts.append(chunk.to_csv(index=False, header=(index == 0)))
+    return "".join(parts)
+
+def read_csv_file(file_path_or_buffer, full_rows=False):
+    """Returns a bounded summary of the CSV, or every row when full_rows is set."""
+    try:
+        if full_rows:
+            return read_csv_rows_text(file_path_or_buffer)
+        return summarize_csv(file_path_or_buffer)
     except Exception as e:
         st.error(f"Error reading CSV file: {e}")
         return None
 
+# --- Parsed Upload Cache ---
+@st.cache_resource
+def get_parse_cache():
+    """Process-wide cache of parsed uploads, keyed by content hash and parser version."""
+    return TTLCache(
+        max_entries=512,
+        max_bytes=PARSE_CACHE_MAX_BYTES,
+        size_of=len,
+        db_path=PARSE_CACHE_PATH,
+    )
+
+def uploaded_file_bytes(uploaded_file):
+    if hasattr(uploaded_file, "getvalue"):
+        return uploaded_file.getvalue()
+    uploaded_file.seek(0)
+    data = uploaded_file.read()
+    uploaded_file.seek(0)
+    return data
+
+def cached_parse(uploaded_file, kind, parser):
+    """
+    Returns parser(uploaded_file), reusing an earlier result for the same bytes so reruns,
+    re-comparisons and re-conversions skip parsing. Failed parses (None) are not cached.
+    """
+    digest = hashlib.sha256(uploaded_file_bytes(uploaded_file)).hexdigest()
+    key = f"v{PARSER_VERSION}:{kind}:{digest}"
+    cache = get_parse_cache()
+    content = cache.get(key)
+    if content is None:
+        if hasattr(uploaded_file, "seek"):
+            uploaded_file.seek(0)
+        content = parser(uploaded_file)
+        if content is not None:
+            cache.set(key, content)
+    return content
+
 # Helper for uploaded files (file-like objects)
-def read_uploaded_file(uploaded_file):
+def read_uploaded_file(uploaded_file, full_rows=False, ocr_stats=None):
     file_extension = os.path.splitext(uploaded_file.name)[1].lower()
+    kind = file_extension + (":rows" if full_rows and file_extension == '.csv' else "")
+    return cached_parse(uploaded_file, kind, lambda f: parse_uploaded_file(f, file_extension, full_rows, ocr_stats))
+
+def parse_uploaded_file(uploaded_file, file_extension, full_rows=False, ocr_stats=None):
     if file_extension == '.docx':
         return read_docx_file(uploaded_file)
     elif file_extension == '.pdf':
-        return read_pdf_file(uploaded_file)
+        return read_pdf_file(uploaded_file, ocr_stats=ocr_stats)
     elif file_extension == '.txt':
         return read_txt_file(uploaded_file)
     elif file_extension == '.csv':
-        return read_csv_file(uploaded_file)
+        return read_csv_file(uploaded_file, full_rows=full_rows)
     else:
         st.error(f"Unsupported file type: {file_extension}")
         return None
 
-def read_file(file_path):
+def read_file(file_path, max_pages=None, ocr_stats=None):
     file_extension = os.path.splitext(file_path)[1].lower()
     if file_extension == '.docx':
         return read_docx_file(file_path)
     elif file_extension == '.pdf':
-        return read_pdf_file(file_path)
+        return read_pdf_file(file_path, max_pages=max_pages, ocr_stats=ocr_stats)
     elif file_extension == '.txt':
         return read_txt_file(file_path)
     elif file_extension == '.csv':
@@ -206,13 +451,50 @@ def get_time():
     now = datetime.datetime.now()
     return f"The current time is {now.strftime('%H:%M:%S')}"
 
+@st.cache_resource
+def get_file_index():
+    """Returns the process-wide filename index, shared across reruns and sessions."""
+    index = FileIndex(FILE_INDEX_ROOTS, FILE_INDEX_PATH)
+    index.refresh_async()
+    return index
+
+def lookup_indexed(name, is_dir, search_root):
+    """
+    Looks a name up in the filename index. Returns (found, path), where found is False
+    when the index cannot answer (root not indexed or first scan still running).
+    """
+    index = get_file_index()
+    if not index.covers(search_root) or not index.is_ready():
+        return False, None
+    index.refresh_if_stale(FILE_INDEX_MAX_AGE)
+    matches = index.find(name, is_dir=is_dir, under=search_root)
+    if not matches:
+        # The entry may be newer than the last scan; catch up in the background so a
+        # retry finds it, without making "not found" answers wait for a rescan.
+        index.refresh_async()
+        return True, None
+    return True, matches[0]
+
+def suggest_names(name, is_dir, search_root="C:\\"):
+    """Returns close matches from the filename index for 'not found' messages."""
+    index = get_file_index()
+    if not index.is_ready():
+        return []
+    return index.find_fuzzy(name, is_dir=is_dir, under=search_root, limit=3)
+
 def find_file(file_name, search_root="C:\\"):
+    found, path = lookup_indexed(file_name, False, search_root)
+    if found:
+        return path
     for root, dirs, files in os.walk(search_root):
         if file_name in files:
             return os.path.join(root, file_name)
     return None
 
 def find_directory(dir_name, search_root="C:\\"):
+    found, path = lookup_indexed(dir_name, True, search_root)
+    if found:
+        return path
     for root, dirs, files in os.walk(search_root):
         if dir_name in dirs:
             return os.path.join(root, dir_name)
@@ -234,113 +516,91 @@ def list_scholarship_files(directory_path):
     return "\n".join(result)
 
 def transcribe_audio(audio_file):
-    recognizer = sr.Recognizer()
-    if not audio_file.name.lower().endswith('.wav'):
-        try:
-            audio = AudioSegment.from_file(audio_file)
-            audio_file_wav = io.BytesIO()
-            audio.export(audio_file_wav, format="wav")
-            audio_file_wav.seek(0)
-            audio_file = audio_file_wav
-        except Exception as e:
-            st.error(f"Error converting audio file: {e}")
-            return None
+    """
+    Transcribes an uploaded recording in silence-split chunks recognized concurrently,
+    showing the transcript as it fills in.
+    """
+    progress = st.progress(0.0, text="Decoding audio...")
+    preview = st.empty()
+
+    def show_progress(done, total, text, failed):
+        note = f" ({failed} failed)" if failed else ""
+        progress.progress(done / total, text=f"Transcribed {done} of {total} chunks{note}")
+        preview.text(text)
+
     try:
-        with sr.AudioFile(audio_file) as source:
-            audio_data = recognizer.record(source)
-            return recognizer.recognize_google(audio_data)
+        recognize = get_recognizer(st.session_state.get("speech_backend"))
+        text, failed = transcribe(audio_file, recognize=recognize, on_progress=show_progress)
+        if failed:
+            st.warning(f"{failed} part(s) of the recording could not be transcribed; they are marked [inaudible] in the text.")
+        return text
     except Exception as e:
         st.error(f"Error transcribing audio: {e}")
         return None
 
 def transcribe_microphone():
     r = sr.Recognizer()
+    recognize = get_recognizer(st.session_state.get("speech_backend"))
     try:
         with sr.Microphone() as source:
             with st.spinner("Listening..."):
                 audio = r.listen(source, timeout=5)
         try:
-            text = r.recognize_google(audio)
+            text = recognize(audio)
+            if not text:
+                st.error("Could not understand audio")
+                return None
             return text
-        except sr.UnknownValueError:
-            st.error("Could not understand audio")
-            return None
-        except sr.RequestError as e:
+        except Exception as e:
             st.error(f"Error: {e}")
             return None
     except OSError:
         st.error("No microphone detected. Please ensure a microphone is connected.")
         return None
 
-def play_audio_with_delay(audio_bytes, delay=10000):
+def render_read_aloud():
     """
-    Converts audio bytes to base64 and creates an HTML audio element that auto-plays after a delay.
-    Also listens for key events: "p" to play, "s" to stop.
-    Returns the HTML string so it can be stored and rendered persistently.
+    Shows the read-aloud player. For a new answer the clips are synthesized here: the player
+    starts on the first clip and is re-rendered (resuming in place) as later ones arrive.
+    Session state keeps only the clip names; their URLs are re-issued on every run.
     """
-    b64_audio = base64.b64encode(audio_bytes.read()).decode()
-    audio_html = f"""
-    <audio id="tts-audio" controls src="data:audio/mp3;base64,{b64_audio}"></audio>
-    <script>
-    // Auto-play after delay
-    setTimeout(function() {{
-       var audio = document.getElementById("tts-audio");
-       if(audio) {{
-          audio.play();
-       }}
-    }}, {delay});
-
-    // Listen for key events: p to play, s to pause
-    document.addEventListener('keydown', function(e) {{
-      var audio = document.getElementById("tts-audio");
-      if(!audio) return;
-      if(e.key === 'p' || e.key === 'P') {{
-         audio.play();
-      }} else if(e.key === 's' || e.key === 'S') {{
-         audio.pause();
-      }}
-    }});
-    </script>
-    """
-    return audio_html
-
-# --- Document Comparison Helper ---
-def compare_documents(doc1, doc2):
-    """Generates a unified diff between two document texts."""
-    lines1 = doc1.splitlines(keepends=True)
-    lines2 = doc2.splitlines(keepends=True)
-    diff = difflib.unified_diff(lines1, lines2, fromfile='Document1', tofile='Document2', lineterm='')
-    return ''.join(diff)
+    slot = st.empty()
+    text = st.session_state.get("tts_text")
+    if text:
+        clips, urls = [], []
+        try:
+            for name in iter_clips(text):
+                clips.append(name)
+                urls.append(audio_url(name))
+                with slot.container():
+                    components.html(play_audio_with_delay(urls, st.session_state.tts_playlist, delay=2000), height=200)
+        except Exception as e:
+            st.error(f"Error in text-to-speech conversion: {e}")
+        st.session_state.tts_audio = clips
+        st.session_state.tts_text = None
+    elif st.session_state.tts_audio:
+        if not all(audio_store.exists(name) for name in st.session_state.tts_audio):
+            # A clip was evicted from the audio store since it was synthesized
+            st.session_state.tts_audio = []
+            return
+        urls = [audio_url(name) for name in st.session_state.tts_audio]
+        with slot.container():
+            components.html(play_audio_with_delay(urls, st.session_state.tts_playlist, delay=2000), height=200)
 
 # --- Conversion Helper Functions ---
-def text_to_pdf(text):
-    """Converts plain text into a PDF file using FPDF."""
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    for line in text.split('\n'):
-        pdf.multi_cell(0, 10, line)
-    pdf_bytes = io.BytesIO()
-    pdf.output(pdf_bytes)
-    pdf_bytes.seek(0)
-    return pdf_bytes
-
 def convert_pdf_to_docx(pdf_file):
     """Converts a PDF file to a DOCX file by extracting text and writing paragraphs."""
-    text = read_pdf_file(pdf_file)
+    ocr_stats = {}
+    text = read_uploaded_file(pdf_file, ocr_stats=ocr_stats)
+    if ocr_stats:
+        st.caption(format_ocr_stats(ocr_stats))
     if text is None:
         return None
-    doc = Document()
-    for line in text.split('\n'):
-        doc.add_paragraph(line)
-    docx_bytes = io.BytesIO()
-    doc.save(docx_bytes)
-    docx_bytes.seek(0)
-    return docx_bytes
+    return text_to_docx(text)
 
 def convert_docx_to_pdf(docx_file):
     """Converts a DOCX file to PDF by extracting text and writing it into a PDF."""
-    text = read_docx_file(docx_file)
+    text = read_uploaded_file(docx_file)
     if text is None:
         return None
     return text_to_pdf(text)
@@ -360,125 +620,260 @@ def convert_text_to_pdf(file):
         return None
 
 def convert_csv_to_excel(csv_file):
-    """Converts a CSV file to Excel format using pandas."""
+    """Converts a CSV file to Excel (streamed through a temp file) and returns the .xlsx bytes."""
     try:
-        df = pd.read_csv(csv_file)
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            df.to_excel(writer, index=False)
-        output.seek(0)
-        return output
+        with csv_to_excel(csv_file) as output:
+            return output.read()
     except Exception as e:
         st.error(f"Error converting CSV to Excel: {e}")
         return None
 
-def convert_excel_to_csv(excel_file):
-    """Converts an Excel file to CSV format using pandas."""
+def convert_excel_to_csv(excel_file, sheet_name=None):
+    """Converts one sheet of an Excel file to CSV (streamed through a temp file) and returns the CSV bytes."""
     try:
-        df = pd.read_excel(excel_file)
-        csv_data = df.to_csv(index=False)
-        csv_bytes = io.BytesIO(csv_data.encode('utf-8'))
-        return csv_bytes
+        with excel_to_csv(excel_file, sheet_name=sheet_name) as output:
+            return output.read()
     except Exception as e:
         st.error(f"Error converting Excel to CSV: {e}")
         return None
 
+# --- Batch Conversion Helper ---
+def run_batch_conversion(conversion, jobs):
+    """
+    Converts (name, source) jobs in worker processes, showing per-file progress, and
+    writes each result into a ZIP on disk as it finishes. Returns (zip path, failures).
+    """
+    progress = st.progress(0.0, text=f"Converting {len(jobs)} files...")
+    status = st.empty()
+    failures = []
+    used_names = set()
+    zip_file = tempfile.NamedTemporaryFile(suffix=".zip", delete=False)
+    with zipfile.ZipFile(zip_file, "w", zipfile.ZIP_DEFLATED) as archive:
+        for done, (name, output_path, error) in enumerate(batch_convert(conversion, jobs), start=1):
+            if error:
+                failures.append((name, error))
+            else:
+                arcname = output_name(conversion, name)
+                stem, ext = os.path.splitext(arcname)
+                counter = 2
+                while arcname in used_names:
+                    arcname = f"{stem} ({counter}){ext}"
+                    counter += 1
+                used_names.add(arcname)
+                archive.write(output_path, arcname)
+                os.remove(output_path)
+            progress.progress(done / len(jobs), text=f"Converted {done} of {len(jobs)} files")
+            status.text(f"{'Failed' if error else 'Done'}: {os.path.basename(name)}")
+    zip_file.close()
+    return zip_file.name, failures
+
 # --- Gemini Chat Function ---
+def generate_text(query):
+    """Returns the (cached) Gemini response for query; raises on API errors."""
+    cached = get_cached_response(GEMINI_MODEL, query)
+    if cached is not None:
+        return cached
+    model = genai.GenerativeModel(GEMINI_MODEL)
+    response = model.generate_content(query)
+    text = response.text.strip()
+    cache_response(GEMINI_MODEL, query, text)
+    return text
+
 def chat(query):
     try:
-        model = genai.GenerativeModel("gemini-2.0-flash")
-        response = model.generate_content(query)
-        return response.text.strip()
+        return generate_text(query)
     except Exception as e:
         return f"Error generating response: {str(e)}"
 
+def stream_chunk_text(chunk):
+    # chunk.text raises on chunks without a text part (safety-blocked or finish-only chunks)
+    if not chunk.candidates or not chunk.candidates[0].content.parts:
+        return ""
+    return "".join(getattr(part, "text", "") for part in chunk.candidates[0].content.parts)
+
+def chat_stream(query):
+    """Yields the Gemini response in chunks as they arrive; raises on API errors."""
+    cached = get_cached_response(GEMINI_MODEL, query)
+    if cached is not None:
+        yield cached
+        return
+    model = genai.GenerativeModel(GEMINI_MODEL)
+    chunks = []
+    for chunk in model.generate_content(query, stream=True):
+        text = stream_chunk_text(chunk)
+        if text:
+            chunks.append(text)
+            yield text
+    # Only reached when the stream finished normally; errors and abandoned streams raise first
+    cache_response(GEMINI_MODEL, query, "".join(chunks).strip())
+
+def render_stream(chunks, placeholder):
+    """
+    Renders streamed chunks into a chat placeholder and returns the full text. If the
+    stream fails part way, the partial answer is kept and the error is shown separately.
+    """
+    text = ""
+    try:
+        for chunk in chunks:
+            text += chunk
+            placeholder.markdown(
+                f'<div class="message message-astra"><p><strong>Astra:</strong> {text}▌</p></div>',
+                unsafe_allow_html=True,
+            )
+    except Exception as e:
+        if not text.strip():
+            text = f"Error generating response: {str(e)}"
+        else:
+            st.session_state.stream_error = f"The response was cut short: {e}"
+    if not text.strip():
+        text = "No response was generated (it may have been blocked by the safety filters)."
+    placeholder.markdown(
+        f'<div class="message message-astra"><p><strong>Astra:</strong> {text}</p></div>',
+        unsafe_allow_html=True,
+    )
+    return text.strip()
+
 # --- AI-Driven Insights Helper ---
-def get_contextual_insights():
+def compact_payload(text, limit):
+    """Truncates text to limit characters, tagging the cut with its length and a short SHA-256."""
+    if len(text) <= limit:
+        return text
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+    return f"{text[:limit]} [... {len(text) - limit} more chars, sha256:{digest}]"
+
+def update_history_digest(upto):
+    """
+    Folds st.session_state.messages[:upto] that are not yet digested into the per-session
+    digest, so large payloads such as file dumps are only stored as truncated references.
+    """
+    digest = st.session_state.history_digest
+    for speaker, message in st.session_state.messages[st.session_state.digest_count:upto]:
+        flattened = " ".join(message.split())
+        digest.append(f"{speaker}: {compact_payload(flattened, DIGEST_ENTRY_CHARS)}")
+    st.session_state.digest_count = max(st.session_state.digest_count, upto)
+    del digest[:-DIGEST_MAX_ENTRIES]
+    return digest
+
+def build_insights_context():
+    """Returns the (digest, last exchange) pair the insights prompt is built from."""
+    messages = st.session_state.messages
+    last_exchange = messages[-2:]
+    digest = update_history_digest(len(messages) - len(last_exchange))
+    last_exchange = [(speaker, compact_payload(message, LAST_EXCHANGE_CHARS)) for speaker, message in last_exchange]
+    return list(digest), last_exchange
+
+def get_contextual_insights(context=None):
     """
-    Analyzes the conversation history stored in st.session_state.messages and returns
-    contextual recommendations based on past interactions.
+    Analyzes the conversation and returns contextual recommendations based on past
+    interactions. The context is a (digest, last exchange) pair from
+    build_insights_context(); it is built from session state when omitted, and must be
+    passed in when called from a worker thread.
     """
-    if not st.session_state.messages or len(st.session_state.messages) < 2:
+    if context is None:
+        context = build_insights_context()
+    digest, last_exchange = context
+    if len(digest) + len(last_exchange) < 2:
         return ""  # Not enough context to generate insights.
     
-    # Compile conversation history into a single string
-    conversation_history = "\n".join(
-        [f"{speaker}: {message}" for speaker, message in st.session_state.messages]
-    )
+    # Condensed history plus the latest exchange verbatim
+    earlier = "\n".join(digest) if digest else "(none)"
+    latest = "\n".join([f"{speaker}: {message}" for speaker, message in last_exchange])
     
     prompt = (
         "Based on the following conversation, provide some contextual recommendations or "
         "suggestions for further actions that might be helpful for the user. Keep the advice clear "
         "and concise.\n\n"
-        f"{conversation_history}\n\nRecommendations:"
+        f"Earlier conversation (condensed):\n{earlier}\n\n"
+        f"Latest exchange:\n{latest}\n\nRecommendations:"
     )
     insights = chat(prompt)
     return insights
 
-# --- New Helper Functions for Weather, News, and Stock APIs ---
+@st.cache_resource
+def get_insights_executor():
+    """Returns the worker pool that generates insights alongside the main answer."""
+    return ThreadPoolExecutor(max_workers=INSIGHTS_WORKERS)
+
+def attach_insights(index, insights):
+    """Appends insights to the Astra message at the given index."""
+    speaker, message = st.session_state.messages[index]
+    st.session_state.messages[index] = (speaker, f"{message}\n\n**Additional Recommendations:**\n{insights}")
+
+def collect_pending_insights():
+    """Attaches insights that finished after their turn had already been rendered."""
+    still_pending = []
+    for index, future in st.session_state.get("pending_insights", []):
+        if not future.done():
+            still_pending.append((index, future))
+            continue
+        try:
+            insights = future.result()
+        except Exception:
+            insights = ""
+        if insights and index < len(st.session_state.messages):
+            attach_insights(index, insights)
+    st.session_state.pending_insights = still_pending
+
+# --- New Helper Functions for Weather and News APIs ---
 def get_weather(location):
     """Fetches weather information for a given location using OpenWeatherMap API."""
     try:
-        url = f"http://api.openweathermap.org/data/2.5/weather?q={location}&appid={WEATHER_API_KEY}&units=metric"
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
+        params = {"q": location, "appid": WEATHER_API_KEY, "units": "metric"}
+        status, data = fetch_json("weather", "http://api.openweathermap.org/data/2.5/weather", params=params)
+        if status == 200:
             description = data["weather"][0]["description"]
             temp = data["main"]["temp"]
             humidity = data["main"]["humidity"]
             return f"Weather in {location}:\nDescription: {description.capitalize()}\nTemperature: {temp}°C\nHumidity: {humidity}%"
+        elif status == 429:
+            return "Weather service is rate limited right now. Please try again in a minute."
         else:
-            return f"Error fetching weather data: {response.status_code}"
-    except Exception as e:
-        return f"Error: {str(e)}"
-
-def get_stock(stock_symbol):
-    """Fetches stock data for a given symbol using Finnhub API."""
-    try:
-        url = f"https://finnhub.io/api/v1/quote?symbol={stock_symbol}&token={FINHUB_API_KEY}"
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            current = data.get("c")
-            high = data.get("h")
-            low = data.get("l")
-            open_price = data.get("o")
-            previous_close = data.get("pc")
-            return (
-                f"Stock {stock_symbol}:\n"
-                f"Current Price: {current}\n"
-                f"High: {high}\n"
-                f"Low: {low}\n"
-                f"Open: {open_price}\n"
-                f"Previous Close: {previous_close}"
-            )
-        else:
-            return f"Error fetching stock data: {response.status_code}"
+            return f"Error fetching weather data: {status}"
     except Exception as e:
         return f"Error: {str(e)}"
 
 def get_news():
     """Fetches top news headlines using NewsAPI."""
     try:
-        url = f"https://newsapi.org/v2/top-headlines?country=us&apiKey={NEWS_API_KEY}"
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
+        params = {"country": "us", "apiKey": NEWS_API_KEY}
+        status, data = fetch_json("news", "https://newsapi.org/v2/top-headlines", params=params)
+        if status == 200:
             articles = data.get("articles", [])
             news_str = ""
             for article in articles[:5]:
                 news_str += f"Title: {article.get('title')}\nSource: {article.get('source', {}).get('name')}\n\n"
             return news_str if news_str else "No news available."
+        elif status == 429:
+            return "News service is rate limited right now. Please try again in a minute."
         else:
-            return f"Error fetching news: {response.status_code}"
+            return f"Error fetching news: {status}"
     except Exception as e:
         return f"Error: {str(e)}"
 
 # --- Modified Process Query Function ---
-def process_query(query):
+def process_query(query, placeholder=None):
+    """
+    Handles a chat query. When a placeholder from the chat container is given and
+    streaming is enabled, general Gemini answers are rendered into it as they arrive.
+    """
     st.session_state.messages.append(("You", query))
+    stream_slot = None
+    if placeholder is not None and st.session_state.get("stream_responses", True):
+        with placeholder.container():
+            st.markdown(
+                f'<div class="message message-you" style="text-align: right;"><p><strong>You:</strong> {query}</p></div>',
+                unsafe_allow_html=True,
+            )
+            stream_slot = st.empty()
+
+    # Start insights now so they are generated while the main answer is produced
+    insights_future = None
+    if st.session_state.get("show_insights", True):
+        insights_future = get_insights_executor().submit(
+            get_contextual_insights, build_insights_context()
+        )
+
     with st.spinner("Astra is thinking..."):
-        time.sleep(0.5)
         lower_query = query.lower()
         response = ""
         
@@ -510,6 +905,9 @@ Return ONLY the name without additional text. Examples:
                     target_dir = find_directory(folder_name)
                 if not target_dir:
                     response = f"Folder '{folder_name}' not found!"
+                    suggestions = suggest_names(folder_name, True)
+                    if suggestions:
+                        response += "\nDid you mean:\n" + "\n".join([f"* *{p}*" for p in suggestions])
                 else:
                     files = list_files_in_directory(target_dir)
                     if isinstance(files, list):
@@ -533,11 +931,19 @@ Return ONLY the name without additional text. Examples:
                     target_file = find_file(file_name)
                 if not target_file:
                     response = f"File '{file_name}' not found!"
+                    suggestions = suggest_names(file_name, False)
+                    if suggestions:
+                        response += "\nDid you mean:\n" + "\n".join([f"* *{p}*" for p in suggestions])
                 else:
-                    content = read_file(target_file)
+                    ocr_stats = {}
+                    content = read_file(target_file, max_pages=EXTRACT_MAX_PAGES, ocr_stats=ocr_stats)
+                    if ocr_stats:
+                        st.caption(format_ocr_stats(ocr_stats))
                     response = f"{target_file} contents:\n\n{content}" if content else "Error reading file"
         
         # General Gemini response
+        elif stream_slot is not None:
+            response = render_stream(chat_stream(query), stream_slot)
         else:
             response = chat(query)
         
@@ -545,24 +951,24 @@ Return ONLY the name without additional text. Examples:
         st.session_state.messages.append(("Astra", response))
         
         # --- Append AI-Driven Insights ---
-        insights = get_contextual_insights()
-        if insights:
-            response_with_insights = f"{response}\n\n**Additional Recommendations:**\n{insights}"
-            # Update the message with the insights
-            st.session_state.messages[-1] = ("Astra", response_with_insights)
-            response = response_with_insights
+        if insights_future is not None:
+            try:
+                insights = insights_future.result(timeout=INSIGHTS_TIMEOUT)
+                if insights:
+                    attach_insights(len(st.session_state.messages) - 1, insights)
+                    response = st.session_state.messages[-1][1]
+            except FutureTimeoutError:
+                # Attach on a later rerun instead of holding up this answer
+                st.session_state.pending_insights.append((len(st.session_state.messages) - 1, insights_future))
+            except Exception as e:
+                st.error(f"Error generating insights: {e}")
         
         # TTS Handling (if enabled)
         if st.session_state.get("read_aloud", False):
-            try:
-                tts = gTTS(response)
-                audio_bytes = io.BytesIO()
-                tts.write_to_fp(audio_bytes)
-                audio_bytes.seek(0)
-                audio_html = play_audio_with_delay(audio_bytes, delay=2000)
-                st.session_state.tts_audio = audio_html
-            except Exception as e:
-                st.error(f"Error in text-to-speech conversion: {e}")
+            # Synthesized by render_read_aloud after the rerun, so playback starts with the first clip
+            st.session_state.tts_text = response
+            st.session_state.tts_audio = []
+            st.session_state.tts_playlist = uuid.uuid4().hex
         
         st.session_state.user_input = ""
         safe_rerun()
@@ -574,7 +980,13 @@ def main():
     if 'user_input' not in st.session_state:
         st.session_state.user_input = ""
     if 'tts_audio' not in st.session_state:
-        st.session_state.tts_audio = ""
+        st.session_state.tts_audio = []
+    if 'pending_insights' not in st.session_state:
+        st.session_state.pending_insights = []
+    if 'history_digest' not in st.session_state:
+        st.session_state.history_digest = []  # Compact per-message entries, updated incrementally
+        st.session_state.digest_count = 0
+    collect_pending_insights()
 
     st.markdown(
         """
@@ -633,9 +1045,44 @@ def main():
         )
         if st.button("Clear Conversation"):
             st.session_state.messages = []
+            st.session_state.pending_insights = []
+            st.session_state.history_digest = []
+            st.session_state.digest_count = 0
             safe_rerun()
 
         st.checkbox("Read bot responses aloud", key="read_aloud", value=False)
+        st.checkbox("Stream responses", key="stream_responses", value=True)
+        st.radio("Speech recognition", SPEECH_BACKENDS, key="speech_backend", horizontal=True)
+        if st.session_state.speech_backend == SPEECH_BACKEND_LOCAL:
+            backend_error = local_backend_error()
+            if backend_error:
+                st.warning(backend_error)
+            else:
+                warm_local_backend()
+        st.checkbox("Show contextual insights", key="show_insights", value=True)
+        cache_stats = response_cache.stats()
+        st.caption(f"Response cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+        entity_stats = get_entity_stats()
+        st.caption(f"Name extraction: {entity_stats['local']} local, {entity_stats['llm']} via Gemini")
+        parse_stats = get_parse_cache().stats()
+        st.caption(
+            f"Parsed-file cache: {parse_stats['size']} files, {parse_stats['bytes'] / 1e6:.1f} MB, "
+            f"{parse_stats['evictions']} evictions"
+        )
+        ocr_stats = ocr_cache.stats()
+        st.caption(f"OCR cache: {ocr_stats['size']} pages, {ocr_stats['hits']} hits")
+        st.caption(f"Scanned PDF pages OCR'd: {ocr_totals['pages']} ({ocr_totals['seconds']:.1f}s)")
+        st.caption(format_http_stats())
+        st.caption(
+            f"Web search: {search_totals['searches']} searches, {search_cache.stats()['hits']} cached, "
+            f"{search_totals['timeouts']} provider timeouts"
+        )
+        tts_stats = tts_cache.stats()
+        store_stats = audio_store.stats()
+        st.caption(
+            f"Speech cache: {store_stats['files']} clips, {store_stats['bytes'] / 1e6:.1f} MB on disk, "
+            f"{tts_stats['hits']} hits"
+        )
         uploaded_audio = st.file_uploader("Upload Audio File", type=["wav", "mp3", "ogg", "m4a"])
         if uploaded_audio:
             transcribed_text = transcribe_audio(uploaded_audio)
@@ -661,21 +1108,71 @@ def main():
             st.markdown("### Document Comparison")
             comp_file1 = st.file_uploader("Upload Document 1", key="comp_file1", type=["docx", "pdf", "txt", "csv"])
             comp_file2 = st.file_uploader("Upload Document 2", key="comp_file2", type=["docx", "pdf", "txt", "csv"])
+            diff_granularity = st.radio("Compare by", ["Lines", "Paragraphs"], key="diff_granularity",
+                                        help="Paragraph mode ignores line wrapping, which suits PDFs.")
             if comp_file1 and comp_file2:
                 if st.button("Compare Documents"):
-                    doc1_content = read_uploaded_file(comp_file1)
-                    doc2_content = read_uploaded_file(comp_file2)
+                    ocr_stats = {}
+                    doc1_content = read_uploaded_file(comp_file1, full_rows=True, ocr_stats=ocr_stats)
+                    doc2_content = read_uploaded_file(comp_file2, full_rows=True, ocr_stats=ocr_stats)
+                    if ocr_stats:
+                        st.caption(format_ocr_stats(ocr_stats))
                     if doc1_content is None or doc2_content is None:
                         st.error("Error reading one of the documents.")
                     else:
-                        diff_result = compare_documents(doc1_content, doc2_content)
-                        st.text_area("Comparison Result (Unified Diff)", diff_result, height=300)
+                        # Kept in session state so paging through the result does not recompute it
+                        hunks, stats = diff_documents(doc1_content, doc2_content, mode=diff_granularity.lower())
+                        st.session_state.diff_hunks = hunks
+                        st.session_state.diff_stats = stats
+                        st.session_state.diff_page = 1
+            if st.session_state.get("diff_hunks") is not None:
+                hunks = st.session_state.diff_hunks
+                stats = st.session_state.diff_stats
+                st.markdown(f"**{stats['hunks']} changed regions:** {stats['removed']} removed, {stats['added']} added")
+                if hunks:
+                    page_count = (len(hunks) + DIFF_HUNKS_PER_PAGE - 1) // DIFF_HUNKS_PER_PAGE
+                    page = st.number_input("Result page", min_value=1, max_value=page_count, key="diff_page")
+                    start = (page - 1) * DIFF_HUNKS_PER_PAGE
+                    page_text = "\n".join(hunks[start:start + DIFF_HUNKS_PER_PAGE])
+                    st.text_area(f"Comparison Result (page {page} of {page_count})", page_text, height=300)
+                    st.download_button("Download Full Diff", data="--- Document1\n+++ Document2\n" + "\n".join(hunks),
+                                       file_name="comparison.diff")
+                else:
+                    st.info("The documents are identical.")
                         
         if mode == "File Conversion":
             st.markdown("### File Conversion")
             conversion_option = st.radio("Select Conversion Type", 
                                           ["PDF to DOCX", "DOCX to PDF", "HTML/Markdown to PDF", "CSV to Excel", "Excel to CSV"])
-            if conversion_option in ["PDF to DOCX", "DOCX to PDF", "HTML/Markdown to PDF", "CSV to Excel", "Excel to CSV"]:
+            batch_mode = st.checkbox("Batch mode (convert many files into one ZIP)", key="batch_conversion")
+            if batch_mode:
+                accepted_types = CONVERSIONS[conversion_option][0]
+                batch_files = st.file_uploader("Upload files for conversion", key="batch_files",
+                                               type=accepted_types, accept_multiple_files=True)
+                batch_dir = st.text_input("Or convert every matching file in a folder on this machine", key="batch_dir")
+                if (batch_files or batch_dir.strip()) and st.button("Convert All"):
+                    jobs = [(f.name, f.getvalue()) for f in batch_files or []]
+                    if batch_dir.strip():
+                        try:
+                            jobs += [(path, path) for path in list_convertible_files(batch_dir.strip(), conversion_option)]
+                        except OSError as e:
+                            st.error(f"Error reading folder: {e}")
+                    if not jobs:
+                        st.info("No matching files to convert.")
+                    else:
+                        zip_path, failures = run_batch_conversion(conversion_option, jobs)
+                        converted = len(jobs) - len(failures)
+                        st.success(f"Converted {converted} of {len(jobs)} files.")
+                        if failures:
+                            with st.expander(f"{len(failures)} files failed"):
+                                for name, error in failures:
+                                    st.markdown(f"- **{os.path.basename(name)}**: {error}")
+                        if converted:
+                            with open(zip_path, "rb") as zip_data:
+                                st.download_button("Download Converted Files (ZIP)", data=zip_data,
+                                                   file_name="converted_files.zip", mime="application/zip")
+                        os.remove(zip_path)
+            elif conversion_option in ["PDF to DOCX", "DOCX to PDF", "HTML/Markdown to PDF", "CSV to Excel", "Excel to CSV"]:
                 upload_label = "Upload file for conversion"
                 conv_file = st.file_uploader(upload_label, key="conv_file", 
                                              type={
@@ -685,6 +1182,14 @@ def main():
                                                  "CSV to Excel": ["csv"],
                                                  "Excel to CSV": ["xlsx", "xls"]
                                              }[conversion_option])
+                sheet_name = None
+                if conv_file and conversion_option == "Excel to CSV":
+                    try:
+                        sheets = excel_sheet_names(conv_file)
+                    except Exception:
+                        sheets = []
+                    if len(sheets) > 1:
+                        sheet_name = st.selectbox("Sheet to convert", sheets, key="conv_sheet")
                 if conv_file:
                     if st.button("Convert File"):
                         converted_bytes = None
@@ -702,7 +1207,7 @@ def main():
                             converted_bytes = convert_csv_to_excel(conv_file)
                             out_ext = ".xlsx"
                         elif conversion_option == "Excel to CSV":
-                            converted_bytes = convert_excel_to_csv(conv_file)
+                            converted_bytes = convert_excel_to_csv(conv_file, sheet_name=sheet_name)
                             out_ext = ".csv"
                         if converted_bytes is None:
                             st.error("Conversion failed.")
@@ -721,18 +1226,39 @@ def main():
             st.markdown("### YouTube Video Summarization")
             youtube_url = st.text_input("Enter YouTube Video URL", key="youtube_url")
             if youtube_url and st.button("Summarize Video"):
-                transcript = get_youtube_transcript(youtube_url)
-                if transcript:
-                    summary = summarize_transcript(transcript)
+                progress = st.empty()
+                partial_view = st.empty()
+
+                def show_partial(done, total, text):
+                    progress.progress(done / total, text=f"Summarized {done} of {total} parts")
+                    partial_view.markdown(text)
+
+                summary = summarize_video(youtube_url, on_partial=show_partial)
+                progress.empty()
+                partial_view.empty()
+                if summary:
                     st.text_area("Video Summary", summary, height=300)
                     
         if mode == "Image Text Extraction":
             st.markdown("### Image Text Extraction")
-            img_file = st.file_uploader("Upload an Image", key="img_file", type=["png", "jpg", "jpeg", "tiff", "bmp"])
-            if img_file and st.button("Extract Text"):
-                extracted_text = extract_text_from_image(img_file)
+            img_files = st.file_uploader(
+                "Upload Images", key="img_file", type=["png", "jpg", "jpeg", "tiff", "tif", "bmp"],
+                accept_multiple_files=True,
+            )
+            if len(img_files) == 1 and st.button("Extract Text"):
+                extracted_text = extract_text_from_image(img_files[0])
                 if extracted_text:
                     st.text_area("Extracted Text", extracted_text, height=300)
+            elif len(img_files) > 1 and st.button(f"Extract Text from {len(img_files)} Images"):
+                results, failures = run_batch_ocr(img_files)
+                for name, error in failures:
+                    st.error(f"{name}: {error}")
+                for name, text in results:
+                    with st.expander(name):
+                        st.text(text or "(no text found)")
+                if results:
+                    combined = "\n\n".join(f"===== {name} =====\n{text}" for name, text in results)
+                    st.download_button("Download All Text", combined, file_name="ocr_results.txt")
                     
         if mode == "Advanced NLP Analysis":
             st.markdown("### Advanced NLP Analysis")
@@ -764,11 +1290,20 @@ def main():
                 st.text_area("News Headlines", news_info, height=300)
                 
         if mode == "Stock":
-            st.markdown("### Stock Information")
-            stock_symbol = st.text_input("Enter stock symbol (e.g., AAPL)", key="stock_symbol")
-            if stock_symbol and st.button("Get Stock Data"):
-                stock_info = get_stock(stock_symbol)
-                st.text_area("Stock Details", stock_info, height=150)
+            st.markdown("### Stock Watchlist")
+            symbols = parse_symbols(st.text_input("Enter stock symbols (e.g., AAPL, MSFT, NVDA)", key="stock_symbol"))
+            if "watchlist" not in st.session_state:
+                st.session_state.watchlist = {}
+            table = st.empty()
+            if symbols and st.button(f"Get Quotes ({len(symbols)})"):
+                def show_rows(changed):
+                    table.dataframe(watchlist_frame(st.session_state.watchlist, symbols, changed), hide_index=True)
+
+                show_rows(set())
+                changed = refresh_watchlist(st.session_state.watchlist, symbols, FINHUB_API_KEY, on_change=show_rows)
+                st.caption(f"{len(changed)} of {len(symbols)} rows changed since the last refresh")
+            elif st.session_state.watchlist:
+                table.dataframe(watchlist_frame(st.session_state.watchlist, symbols), hide_index=True)
 
     st.title("Astra S-1: Your Personal AI Assistant")
     
@@ -789,8 +1324,10 @@ def main():
                         )
             else:
                 st.info("Your conversation will appear here.")
-        if st.session_state.tts_audio:
-            components.html(st.session_state.tts_audio, height=200)
+            if st.session_state.get("stream_error"):
+                st.error(st.session_state.pop("stream_error"))
+            stream_placeholder = st.empty()
+        render_read_aloud()
         col1, col2 = st.columns([5, 1])
         with col1:
             with st.form(key='text_form', clear_on_submit=True):
@@ -808,7 +1345,7 @@ def main():
                     st.session_state.user_input = transcribed_text
                     safe_rerun()
         if submitted and user_input:
-            process_query(user_input)
+            process_query(user_input, stream_placeholder)
     
     st.markdown("---")
     st.markdown(
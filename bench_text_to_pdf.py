@@ -0,0 +1,47 @@
+"""
+Benchmark for converters.text_to_pdf: pages per second of the pre-wrapped writer vs. the
+previous one-multi_cell-per-line approach.
+
+    python bench_text_to_pdf.py [number_of_lines]
+"""
+import io
+import sys
+import time
+from fpdf import FPDF
+from converters import text_to_pdf
+
+def legacy_text_to_pdf(text):
+    # The previous implementation: one multi_cell call per input line
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Helvetica", size=12)
+    for line in text.split('\n'):
+        pdf.multi_cell(0, 10, line, new_x="LMARGIN", new_y="NEXT")
+    pdf_bytes = io.BytesIO()
+    pdf.output(pdf_bytes)
+    return pdf, pdf_bytes
+
+def sample_text(line_count):
+    sentence = "The quick brown fox jumps over the lazy dog while the meeting notes keep scrolling by. "
+    return "\n".join(sentence * (1 + i % 3) for i in range(line_count))
+
+def main():
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    text = sample_text(line_count)
+
+    start = time.perf_counter()
+    legacy_pdf, _ = legacy_text_to_pdf(text)
+    legacy_seconds = time.perf_counter() - start
+    legacy_pages = legacy_pdf.page
+
+    start = time.perf_counter()
+    output = text_to_pdf(text)
+    new_seconds = time.perf_counter() - start
+    new_pages = output.getvalue().count(b"/Type /Page") - output.getvalue().count(b"/Type /Pages")
+
+    print(f"{line_count} input lines")
+    print(f"legacy multi_cell: {legacy_pages} pages in {legacy_seconds:.2f}s ({legacy_pages / legacy_seconds:.1f} pages/s)")
+    print(f"pre-wrapped:       {new_pages} pages in {new_seconds:.2f}s ({new_pages / new_seconds:.1f} pages/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import os
+import hashlib
+import tempfile
+import threading
+import functools
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+# --- Content-addressed File Store ---
+class BlobStore:
+    """
+    Files named by the SHA-256 of their content, kept under a total size budget (least
+    recently used out first) and optionally served over HTTP. Because a name always means
+    the same bytes, browsers can cache served files forever.
+    """
+
+    def __init__(self, root, max_bytes=200 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._base_url = None
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, name):
+        return os.path.join(self.root, os.path.basename(name))
+
+    def exists(self, name):
+        return os.path.exists(self.path(name))
+
+    def put(self, data, ext=""):
+        """Stores data (if new) and returns its name, e.g. '<sha256>.mp3'."""
+        name = hashlib.sha256(data).hexdigest() + ext
+        path = self.path(name)
+        with self._lock:
+            if os.path.exists(path):
+                os.utime(path)  # Mark as recently used
+                return name
+            with tempfile.NamedTemporaryFile(dir=self.root, suffix=".part", delete=False) as temp_file:
+                temp_file.write(data)
+            os.replace(temp_file.name, path)
+            self._evict(keep=name)
+        return name
+
+    def touch(self, name):
+        try:
+            os.utime(self.path(name))
+        except OSError:
+            pass
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.root):
+            if entry.is_file() and not entry.name.endswith(".part"):
+                info = entry.stat()
+                entries.append((info.st_mtime, info.st_size, entry.name))
+        return entries
+
+    def _evict(self, keep=None):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            try:
+                os.remove(self.path(name))
+                total -= size
+                self.evictions += 1
+            except OSError:
+                pass
+
+    def stats(self):
+        entries = self._entries()
+        return {
+            "files": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "evictions": self.evictions,
+        }
+
+    # --- HTTP Serving ---
+    def serve(self, host="127.0.0.1", port=0, public_url=None):
+        """
+        Starts a background HTTP server for the store (once) and returns its base URL.
+        port=0 picks a free port; public_url overrides the URL handed to browsers.
+        """
+        with self._lock:
+            if self._server is None:
+                handler = functools.partial(_BlobRequestHandler, directory=self.root)
+                self._server = ThreadingHTTPServer((host, port), handler)
+                thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+                thread.start()
+                self._base_url = public_url or f"http://{host}:{self._server.server_address[1]}"
+            return self._base_url.rstrip("/")
+
+class _BlobRequestHandler(SimpleHTTPRequestHandler):
+    def end_headers(self):
+        self.send_header("Cache-Control", "public, max-age=31536000, immutable")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        super().end_headers()
+
+    def list_directory(self, path):
+        self.send_error(404)
+        return None
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,272 @@
+import io
+import os
+import csv
+import zipfile
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+import openpyxl
+import xlsxwriter
+from openpyxl.utils.exceptions import InvalidFileException
+from docx import Document
+from fpdf import FPDF  # For PDF generation
+from pdf_text import iter_pdf_pages
+
+# --- Batch Conversion Settings ---
+CONVERSION_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+# --- Spreadsheet Conversion Settings ---
+SPREADSHEET_CHUNK_ROWS = 50000   # CSV rows parsed per chunk
+EXCEL_MAX_ROWS = 1048576         # Excel's per-sheet row limit (including the header)
+
+# --- PDF Writer Settings ---
+PDF_FONT_SIZE = 11
+PDF_LINE_HEIGHT = 5.5   # mm
+PDF_MARGIN = 15         # mm
+PDF_FONT_PATH = None    # Set to a .ttf to override the search below
+PDF_FONT_CANDIDATES = [
+    r"C:\Windows\Fonts\arial.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+]
+
+# These helpers raise on failure instead of reporting through Streamlit, so they can
+# run in worker processes; the Streamlit wrappers live in astrabot.py.
+
+def as_file(source):
+    """Wraps raw bytes in a buffer; paths and file objects are passed through."""
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    return source
+
+# --- Text Extraction ---
+def pdf_to_text(source):
+    """source is a path or the PDF bytes."""
+    return '\n'.join(iter_pdf_pages(source, parallel=False))
+
+def docx_to_text(source):
+    doc = Document(as_file(source))
+    return '\n'.join(para.text for para in doc.paragraphs)
+
+def read_text_source(source):
+    if isinstance(source, (bytes, bytearray)):
+        return source.decode("utf-8")
+    with open(source, "r", encoding="utf-8") as file:
+        return file.read()
+
+# --- Writers ---
+def find_pdf_font():
+    """Returns the Unicode TTF used for PDF output, or None to use a core font."""
+    for path in [PDF_FONT_PATH] + PDF_FONT_CANDIDATES:
+        if path and os.path.exists(path):
+            return path
+    return None
+
+def wrap_lines(text, max_width, char_width):
+    """Yields text wrapped at word boundaries to max_width, using per-character widths."""
+    space = char_width(" ")
+    for paragraph in text.replace("\t", "    ").split("\n"):
+        line, width = [], 0.0
+        for word in paragraph.split(" "):
+            word_width = sum(char_width(c) for c in word)
+            if line and width + space + word_width > max_width:
+                yield " ".join(line)
+                line, width = [], 0.0
+            # Words longer than a whole line are split by character
+            while word_width > max_width:
+                cut, cut_width = 0, 0.0
+                while cut < len(word) and cut_width + char_width(word[cut]) <= max_width:
+                    cut_width += char_width(word[cut])
+                    cut += 1
+                cut = max(cut, 1)
+                yield word[:cut]
+                word = word[cut:]
+                word_width = sum(char_width(c) for c in word)
+            width += (space if line else 0.0) + word_width
+            line.append(word)
+        yield " ".join(line)
+
+def text_to_pdf(text, output=None):
+    """
+    Converts plain text into a PDF using FPDF. Text is wrapped up front from cached glyph
+    widths and placed line by line on fixed-height pages, with a Unicode TTF embedded once
+    when one is available. Writes to output (a path or binary stream) if given, otherwise
+    returns a BytesIO.
+    """
+    pdf = FPDF(unit="mm", format="A4")
+    pdf.set_auto_page_break(False)
+    font_path = find_pdf_font()
+    if font_path:
+        pdf.add_font("Body", fname=font_path)
+        pdf.set_font("Body", size=PDF_FONT_SIZE)
+    else:
+        pdf.set_font("Helvetica", size=PDF_FONT_SIZE)
+        text = text.encode("latin-1", "replace").decode("latin-1")
+
+    widths = {}
+    def char_width(c):
+        if c not in widths:
+            widths[c] = pdf.get_string_width(c)
+        return widths[c]
+
+    max_width = pdf.w - 2 * PDF_MARGIN
+    lines_per_page = int((pdf.h - 2 * PDF_MARGIN) // PDF_LINE_HEIGHT)
+    line_count = 0
+    for line in wrap_lines(text, max_width, char_width):
+        slot = line_count % lines_per_page
+        if slot == 0:
+            pdf.add_page()
+        if line.strip():
+            pdf.text(PDF_MARGIN, PDF_MARGIN + (slot + 1) * PDF_LINE_HEIGHT, line)
+        line_count += 1
+    if line_count == 0:
+        pdf.add_page()
+
+    if output is not None:
+        pdf.output(output)
+        return output
+    pdf_bytes = io.BytesIO()
+    pdf.output(pdf_bytes)
+    pdf_bytes.seek(0)
+    return pdf_bytes
+
+def text_to_docx(text, output=None):
+    """
+    Writes each line of text as a DOCX paragraph, to output (a path or binary stream) if
+    given, otherwise to a returned BytesIO.
+    """
+    doc = Document()
+    for line in text.split('\n'):
+        doc.add_paragraph(line)
+    if output is not None:
+        doc.save(output)
+        return output
+    docx_bytes = io.BytesIO()
+    doc.save(docx_bytes)
+    docx_bytes.seek(0)
+    return docx_bytes
+
+def csv_to_excel(source, output=None):
+    """
+    Streams a CSV into an .xlsx file: chunked pandas reads feed xlsxwriter in
+    constant_memory mode, and a new sheet is started whenever Excel's row limit is hit.
+    Writes to the output path if given and returns it, otherwise returns a temp file
+    rewound to the start (the caller closes it).
+    """
+    target = output if output is not None else tempfile.TemporaryFile()
+    workbook = xlsxwriter.Workbook(target, {"constant_memory": True})
+    worksheet, row_num, header = None, EXCEL_MAX_ROWS, None
+    with pd.read_csv(as_file(source), chunksize=SPREADSHEET_CHUNK_ROWS) as reader:
+        for chunk in reader:
+            if header is None:
+                header = [str(column) for column in chunk.columns]
+            # Blank cells instead of NaN, which xlsxwriter cannot store
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            for row in chunk.itertuples(index=False, name=None):
+                if row_num >= EXCEL_MAX_ROWS:
+                    worksheet = workbook.add_worksheet(f"Sheet{len(workbook.worksheets()) + 1}")
+                    worksheet.write_row(0, 0, header)
+                    row_num = 1
+                worksheet.write_row(row_num, 0, row)
+                row_num += 1
+    if worksheet is None:
+        workbook.add_worksheet("Sheet1").write_row(0, 0, header or [])
+    workbook.close()
+    if output is None:
+        target.seek(0)
+    return target
+
+def excel_sheet_names(source):
+    """Lists the sheets of a workbook (.xlsx via openpyxl, legacy .xls via pandas)."""
+    try:
+        workbook = openpyxl.load_workbook(as_file(source), read_only=True)
+        names = workbook.sheetnames
+        workbook.close()
+        return names
+    except (zipfile.BadZipFile, InvalidFileException):
+        if hasattr(source, "seek"):
+            source.seek(0)
+        return pd.ExcelFile(as_file(source)).sheet_names
+
+def excel_to_csv(source, sheet_name=None, output=None):
+    """
+    Writes one sheet (the first by default) as UTF-8 CSV by iterating rows with a
+    read-only openpyxl workbook. Legacy .xls files fall back to pandas. Writes to the
+    output path if given and returns it, otherwise returns a temp file rewound to the
+    start (the caller closes it).
+    """
+    target = open(output, "wb") if output is not None else tempfile.TemporaryFile()
+    text = io.TextIOWrapper(target, encoding="utf-8", newline="")
+    try:
+        workbook = openpyxl.load_workbook(as_file(source), read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException):
+        if hasattr(source, "seek"):
+            source.seek(0)
+        df = pd.read_excel(as_file(source), sheet_name=sheet_name or 0)
+        df.to_csv(text, index=False)
+    else:
+        sheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+        writer = csv.writer(text, lineterminator="\n")
+        for row in sheet.iter_rows(values_only=True):
+            if any(value is not None for value in row):
+                writer.writerow(row)
+        workbook.close()
+    text.flush()
+    text.detach()
+    if output is not None:
+        target.close()
+        return output
+    target.seek(0)
+    return target
+
+# --- Conversion Table ---
+# conversion name -> (accepted extensions, output extension, converter taking a path or
+# bytes and the output path to write)
+CONVERSIONS = {
+    "PDF to DOCX": (["pdf"], ".docx", lambda source, output: text_to_docx(pdf_to_text(source), output)),
+    "DOCX to PDF": (["docx"], ".pdf", lambda source, output: text_to_pdf(docx_to_text(source), output)),
+    "HTML/Markdown to PDF": (["html", "htm", "md", "markdown", "txt"], ".pdf",
+                             lambda source, output: text_to_pdf(read_text_source(source), output)),
+    "CSV to Excel": (["csv"], ".xlsx", lambda source, output: csv_to_excel(source, output=output)),
+    "Excel to CSV": (["xlsx", "xls"], ".csv", lambda source, output: excel_to_csv(source, output=output)),
+}
+
+def output_name(conversion, name):
+    return os.path.splitext(os.path.basename(name))[0] + CONVERSIONS[conversion][1]
+
+def run_conversion(conversion, name, source):
+    """
+    Worker entry point: converts one file straight into a temp file and returns
+    (name, output path, error). The caller removes the output file.
+    """
+    target = None
+    try:
+        with tempfile.NamedTemporaryFile(suffix=CONVERSIONS[conversion][1], delete=False) as target:
+            pass
+        CONVERSIONS[conversion][2](source, target.name)
+        return name, target.name, None
+    except Exception as e:
+        if target is not None and os.path.exists(target.name):
+            os.remove(target.name)
+        return name, None, str(e)
+
+def list_convertible_files(directory, conversion):
+    """Returns the files directly inside directory that the conversion accepts."""
+    extensions = tuple("." + ext for ext in CONVERSIONS[conversion][0])
+    return sorted(
+        os.path.join(directory, entry)
+        for entry in os.listdir(directory)
+        if entry.lower().endswith(extensions) and os.path.isfile(os.path.join(directory, entry))
+    )
+
+# --- Batch Conversion ---
+def batch_convert(conversion, jobs, workers=CONVERSION_WORKERS):
+    """
+    Converts (name, source) jobs across a process pool, where source is a path or the
+    file bytes, and yields (name, output path, error) as each file finishes.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_conversion, conversion, name, source) for name, source in jobs]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,210 @@
+import re
+import bisect
+import difflib
+from collections import Counter
+
+# --- Diff Settings ---
+DIFF_FALLBACK_LIMIT = 250000  # Max len(a) * len(b) handed to difflib when a region has no unique anchors;
+                              # larger anchorless regions are split with a linear-space Myers search
+
+# --- Unit Splitting and Hashing ---
+def split_units(text, mode="lines"):
+    """Splits text into diff units: lines, or paragraphs separated by blank lines."""
+    if mode == "paragraphs":
+        return [normalize_unit(p) for p in re.split(r"\n\s*\n", text) if p.strip()]
+    return text.splitlines()
+
+def normalize_unit(unit):
+    # Whitespace differences (including PDF line wrapping inside paragraphs) are not changes
+    return " ".join(unit.split())
+
+def hash_units(units_a, units_b):
+    """Maps normalized units to small integers so comparisons are int comparisons."""
+    ids = {}
+    hashed_a = [ids.setdefault(normalize_unit(u), len(ids)) for u in units_a]
+    hashed_b = [ids.setdefault(normalize_unit(u), len(ids)) for u in units_b]
+    return hashed_a, hashed_b
+
+# --- Linear-space Myers Split ---
+def _middle_split(a, b, alo, ahi, blo, bhi):
+    """
+    Returns a point (i, j) on a shortest edit path through a[alo:ahi] / b[blo:bhi] with
+    edits on both sides of it, found by running Myers' search from both ends until they
+    meet. Memory is linear; the caller diffs the two halves. The ranges must not share a
+    common prefix or suffix and must both be non-empty.
+    """
+    n, m = ahi - alo, bhi - blo
+    delta = n - m
+    odd = delta % 2 != 0
+    dmax = (n + m + 1) // 2
+    off = dmax + 1
+    forward = [0] * (2 * off + 1)   # diagonal k -> furthest x reached from the start
+    backward = [0] * (2 * off + 1)  # diagonal c -> furthest x reached from the end (mirrored)
+    for d in range(dmax + 1):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and forward[off + k - 1] < forward[off + k + 1]):
+                x = forward[off + k + 1]
+            else:
+                x = forward[off + k - 1] + 1
+            y = x - k
+            start_x, start_y = x, y
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            forward[off + k] = x
+            c = delta - k
+            if odd and -(d - 1) <= c <= d - 1 and x + backward[off + c] >= n:
+                return alo + start_x, blo + start_y
+        for c in range(-d, d + 1, 2):
+            if c == -d or (c != d and backward[off + c - 1] < backward[off + c + 1]):
+                x = backward[off + c + 1]
+            else:
+                x = backward[off + c - 1] + 1
+            y = x - c
+            start_x, start_y = x, y
+            while x < n and y < m and a[ahi - 1 - x] == b[bhi - 1 - y]:
+                x += 1
+                y += 1
+            backward[off + c] = x
+            k = delta - c
+            if not odd and -d <= k <= d and x + forward[off + k] >= n:
+                return ahi - start_x, bhi - start_y
+    return None
+
+# --- Patience Diff ---
+def _unique_anchors(a, b, alo, ahi, blo, bhi):
+    """Longest increasing run of elements that occur exactly once in both ranges."""
+    counts_a = Counter(a[alo:ahi])
+    counts_b = Counter(b[blo:bhi])
+    index_b = {b[j]: j for j in range(blo, bhi) if counts_b[b[j]] == 1}
+    pairs = [(i, index_b[a[i]]) for i in range(alo, ahi) if counts_a[a[i]] == 1 and a[i] in index_b]
+    if not pairs:
+        return []
+    # Patience sorting: longest increasing subsequence of the b positions
+    tails, tail_index, previous = [], [], [None] * len(pairs)
+    for k, (_, j) in enumerate(pairs):
+        pos = bisect.bisect_left(tails, j)
+        if pos == len(tails):
+            tails.append(j)
+            tail_index.append(k)
+        else:
+            tails[pos] = j
+            tail_index[pos] = k
+        previous[k] = tail_index[pos - 1] if pos > 0 else None
+    anchors = []
+    k = tail_index[-1]
+    while k is not None:
+        anchors.append(pairs[k])
+        k = previous[k]
+    anchors.reverse()
+    return anchors
+
+def matching_pairs(a, b):
+    """Returns the (i, j) index pairs of matching elements, in order."""
+    matches = []
+    stack = [(0, len(a), 0, len(b), True)]
+    while stack:
+        alo, ahi, blo, bhi, anchored = stack.pop()
+        # Trim common prefix and suffix
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            matches.append((alo, blo))
+            alo += 1
+            blo += 1
+        while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+            matches.append((ahi, bhi))
+        if alo == ahi or blo == bhi:
+            continue
+        anchors = _unique_anchors(a, b, alo, ahi, blo, bhi) if anchored else []
+        if anchors:
+            i_start, j_start = alo, blo
+            for i, j in anchors:
+                stack.append((i_start, i, j_start, j, True))
+                matches.append((i, j))
+                i_start, j_start = i + 1, j + 1
+            stack.append((i_start, ahi, j_start, bhi, True))
+        elif anchored and (ahi - alo) * (bhi - blo) <= DIFF_FALLBACK_LIMIT:
+            matcher = difflib.SequenceMatcher(None, a[alo:ahi], b[blo:bhi], autojunk=False)
+            for block_i, block_j, size in matcher.get_matching_blocks():
+                for offset in range(size):
+                    matches.append((alo + block_i + offset, blo + block_j + offset))
+        else:
+            # Too big for difflib (repetitive text): split at the middle of a shortest edit
+            # path and keep splitting the halves, whose "unique" lines are only locally so
+            split = _middle_split(a, b, alo, ahi, blo, bhi)
+            if split and (alo, blo) != split != (ahi, bhi):
+                i, j = split
+                stack.append((alo, i, blo, j, False))
+                stack.append((i, ahi, j, bhi, False))
+    matches.sort()
+    return matches
+
+def diff_opcodes(a, b):
+    """difflib-style (tag, i1, i2, j1, j2) opcodes computed with a patience diff."""
+    opcodes = []
+    i = j = 0
+    for mi, mj in matching_pairs(a, b) + [(len(a), len(b))]:
+        if i < mi and j < mj:
+            opcodes.append(("replace", i, mi, j, mj))
+        elif i < mi:
+            opcodes.append(("delete", i, mi, j, j))
+        elif j < mj:
+            opcodes.append(("insert", i, i, j, mj))
+        if mi < len(a) or mj < len(b):
+            if opcodes and opcodes[-1][0] == "equal" and opcodes[-1][2] == mi and opcodes[-1][4] == mj:
+                tag, i1, _, j1, _ = opcodes.pop()
+                opcodes.append(("equal", i1, mi + 1, j1, mj + 1))
+            else:
+                opcodes.append(("equal", mi, mi + 1, mj, mj + 1))
+        i, j = mi + 1, mj + 1
+    return opcodes
+
+# --- Unified Diff Rendering ---
+def group_opcodes(opcodes, context=3):
+    """Splits opcodes into hunks with up to context equal units around each change."""
+    groups, group = [], []
+    for index, (tag, i1, i2, j1, j2) in enumerate(opcodes):
+        if tag == "equal":
+            if index == 0:
+                i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+            elif index == len(opcodes) - 1:
+                i2, j2 = min(i2, i1 + context), min(j2, j1 + context)
+            elif i2 - i1 > 2 * context:
+                group.append((tag, i1, i1 + context, j1, j1 + context))
+                groups.append(group)
+                group = []
+                i1, j1 = i2 - context, j2 - context
+        if i1 < i2 or j1 < j2:
+            group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        groups.append(group)
+    return groups
+
+def render_hunk(group, units_a, units_b):
+    i1, i2, j1, j2 = group[0][1], group[-1][2], group[0][3], group[-1][4]
+    lines = [f"@@ -{i1 + 1},{i2 - i1} +{j1 + 1},{j2 - j1} @@"]
+    for tag, a1, a2, b1, b2 in group:
+        if tag == "equal":
+            lines.extend(" " + u for u in units_a[a1:a2])
+            continue
+        lines.extend("-" + u for u in units_a[a1:a2])
+        lines.extend("+" + u for u in units_b[b1:b2])
+    return "\n".join(lines)
+
+def diff_documents(doc1, doc2, mode="lines", context=3):
+    """
+    Compares two document texts by lines or paragraphs. Returns (hunks, stats) where
+    hunks is a list of unified-diff hunk strings and stats counts removed/added units.
+    """
+    units_a = split_units(doc1, mode)
+    units_b = split_units(doc2, mode)
+    hashed_a, hashed_b = hash_units(units_a, units_b)
+    opcodes = diff_opcodes(hashed_a, hashed_b)
+    hunks = [render_hunk(group, units_a, units_b) for group in group_opcodes(opcodes, context)]
+    stats = {"removed": 0, "added": 0, "hunks": len(hunks)}
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag != "equal":
+            stats["removed"] += i2 - i1
+            stats["added"] += j2 - j1
+    return hunks, stats
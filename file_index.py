@@ -0,0 +1,175 @@
+import os
+import time
+import bisect
+import difflib
+import sqlite3
+import threading
+
+def _is_under(path, root):
+    """True if path is root or lies beneath it (False across drives)."""
+    try:
+        return os.path.commonpath([root, path]) == root
+    except ValueError:
+        return False
+
+# --- Persistent Filename Index ---
+class FileIndex:
+    """
+    On-disk (SQLite) index of file and directory names under a set of root folders.
+    Lookups are served from an in-memory name table; refreshes are incremental and only
+    re-list directories whose mtime changed since the previous scan.
+    """
+
+    def __init__(self, roots, db_path):
+        self.roots = [os.path.abspath(root) for root in roots]
+        self.db_path = db_path
+        self.last_refresh = None
+        self._db_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refresh_thread = None
+        self._by_name = {}       # lower-cased name -> list of (path, is_dir)
+        self._sorted_names = []  # sorted lower-cased names, for prefix lookups
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "path TEXT PRIMARY KEY, parent TEXT, name TEXT, is_dir INTEGER)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_parent ON entries(parent)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, mtime REAL)")
+        self.conn.commit()
+        self._load()
+
+    # --- Index maintenance ---
+    def _load(self):
+        """Rebuilds the in-memory lookup tables from the database."""
+        by_name = {}
+        with self._db_lock:
+            rows = self.conn.execute("SELECT path, name, is_dir FROM entries").fetchall()
+        for path, name, is_dir in rows:
+            by_name.setdefault(name.lower(), []).append((path, bool(is_dir)))
+        self._sorted_names = sorted(by_name)
+        self._by_name = by_name
+
+    def _scan_dir(self, directory):
+        """Lists a single directory, returning entry rows and its subdirectories."""
+        rows, subdirs = [], []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    rows.append((entry.path, directory, entry.name, int(is_dir)))
+                    if is_dir:
+                        subdirs.append(entry.path)
+        except OSError:
+            pass
+        return rows, subdirs
+
+    def refresh(self):
+        """Incrementally rescans the roots, re-listing only directories whose mtime changed."""
+        with self._refresh_lock:
+            with self._db_lock:
+                known = dict(self.conn.execute("SELECT path, mtime FROM dirs").fetchall())
+                children = {}
+                for parent, path in self.conn.execute("SELECT parent, path FROM entries WHERE is_dir = 1"):
+                    children.setdefault(parent, []).append(path)
+
+            seen = set()
+            changed = []  # (directory, mtime, rows)
+            stack = list(self.roots)
+            while stack:
+                directory = stack.pop()
+                if directory in seen:
+                    continue
+                try:
+                    mtime = os.stat(directory).st_mtime
+                except OSError:
+                    continue
+                seen.add(directory)
+                if known.get(directory) == mtime:
+                    stack.extend(children.get(directory, []))
+                else:
+                    rows, subdirs = self._scan_dir(directory)
+                    changed.append((directory, mtime, rows))
+                    stack.extend(subdirs)
+
+            gone = [directory for directory in known if directory not in seen]
+            with self._db_lock:
+                for directory, mtime, rows in changed:
+                    self.conn.execute("DELETE FROM entries WHERE parent = ?", (directory,))
+                    self.conn.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)", rows)
+                    self.conn.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?)", (directory, mtime))
+                self.conn.executemany("DELETE FROM entries WHERE parent = ?", [(d,) for d in gone])
+                self.conn.executemany("DELETE FROM dirs WHERE path = ?", [(d,) for d in gone])
+                self.conn.commit()
+
+            if changed or gone or self.last_refresh is None:
+                self._load()
+            self.last_refresh = time.time()
+
+    def refresh_async(self):
+        """Starts a background refresh unless one is already running."""
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        self._refresh_thread = threading.Thread(target=self.refresh, daemon=True)
+        self._refresh_thread.start()
+
+    def refresh_if_stale(self, max_age):
+        """Schedules a background refresh if the last one is older than max_age seconds."""
+        if self.last_refresh is None or time.time() - self.last_refresh > max_age:
+            self.refresh_async()
+
+    def is_ready(self):
+        """True once the index holds data from this or a previous run."""
+        return self.last_refresh is not None or bool(self._by_name)
+
+    def covers(self, path):
+        """True if path lies under one of the indexed roots."""
+        path = os.path.abspath(path)
+        return any(_is_under(path, root) for root in self.roots)
+
+    # --- Lookups ---
+    def _select(self, names, exact_name, is_dir, under):
+        by_name = self._by_name
+        under = os.path.abspath(under) if under else None
+        results = []
+        for key in names:
+            for path, entry_is_dir in by_name.get(key, []):
+                if is_dir is not None and entry_is_dir != is_dir:
+                    continue
+                if under and not _is_under(path, under):
+                    continue
+                results.append(path)
+        # Exact-case matches first, then shallowest paths
+        results.sort(key=lambda p: (os.path.basename(p) != exact_name, p.count(os.sep), p))
+        return results
+
+    def find(self, name, is_dir=None, under=None):
+        """Returns the paths whose name matches exactly (case-insensitive)."""
+        return self._select([name.lower()], name, is_dir, under)
+
+    def find_prefix(self, prefix, is_dir=None, under=None, limit=20):
+        """Returns up to limit paths whose name starts with prefix."""
+        prefix = prefix.lower()
+        names = self._sorted_names
+        start = bisect.bisect_left(names, prefix)
+        end = bisect.bisect_right(names, prefix + "\uffff")
+        return self._select(names[start:end], prefix, is_dir, under)[:limit]
+
+    def find_fuzzy(self, name, is_dir=None, under=None, limit=5, cutoff=0.75):
+        """Returns up to limit paths whose name is close to name."""
+        key = name.lower()
+        if not key:
+            return []
+        # Narrow the candidates to names sharing the first character and of similar length
+        names = self._sorted_names
+        start = bisect.bisect_left(names, key[0])
+        end = bisect.bisect_right(names, key[0] + "\uffff")
+        candidates = [n for n in names[start:end] if abs(len(n) - len(key)) <= 3]
+        close = difflib.get_close_matches(key, candidates, n=limit, cutoff=cutoff)
+        results = []
+        for match in close:
+            results.extend(self._select([match], name, is_dir, under))
+        return results[:limit]
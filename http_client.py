@@ -0,0 +1,161 @@
+import time
+import hashlib
+import threading
+from collections import deque
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from ttl_cache import TTLCache
+
+# --- HTTP Client Settings ---
+HTTP_TIMEOUT = (3.05, 10)      # (connect, read) seconds
+HTTP_RETRIES = 3               # Retries for connection errors and 5xx responses
+# 429 is not retried: honouring a long Retry-After would stall the Streamlit run, so the
+# caller gets the status back at once and reports the rate limit instead
+HTTP_BACKOFF = 0.5             # Retry waits grow 0.5s, 1s, 2s ...
+HTTP_POOL_SIZE = 20            # Keep-alive connections kept per host
+HTTP_CACHE_SIZE = 512          # Cached responses per endpoint
+
+# Seconds a successful response is reused, per endpoint; 0 or missing means never cached
+ENDPOINT_TTLS = {
+    "weather": 10 * 60,
+    "quote": 60,
+    "news": 5 * 60,
+    "duckduckgo": 60 * 60,
+    "wikipedia": 60 * 60,
+    "joke": 0,
+}
+
+# --- Shared Sessions (shared by Astra and Vertex) ---
+_sessions = {}  # retries (True/False) -> Session
+_session_lock = threading.Lock()
+_caches = {}
+_stats = {}
+_stats_lock = threading.Lock()
+
+def get_session(retries=True):
+    """
+    Returns the process-wide Session with pooled keep-alive connections, and retries unless
+    retries is False (for rate-limited APIs, where every attempt must pass the limiter).
+    """
+    with _session_lock:
+        if retries not in _sessions:
+            retry = Retry(
+                total=HTTP_RETRIES,
+                backoff_factor=HTTP_BACKOFF,
+                status_forcelist=(500, 502, 503, 504),
+                allowed_methods=("GET",),
+                respect_retry_after_header=False,
+                raise_on_status=False,
+            ) if retries else 0
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[retries] = session
+        return _sessions[retries]
+
+def _endpoint_cache(endpoint):
+    with _session_lock:
+        if endpoint not in _caches:
+            _caches[endpoint] = TTLCache(max_entries=HTTP_CACHE_SIZE, ttl=ENDPOINT_TTLS.get(endpoint))
+        return _caches[endpoint]
+
+def _record(endpoint, **counts):
+    with _stats_lock:
+        stats = _stats.setdefault(endpoint, {"hits": 0, "requests": 0, "errors": 0, "seconds": 0.0})
+        for field, amount in counts.items():
+            stats[field] += amount
+
+# --- Rate Limiting ---
+class RateLimiter:
+    """
+    Sliding-window limiter: for every (max_calls, period) limit given, no more than
+    max_calls calls are let through in any period seconds, e.g. RateLimiter((60, 60), (30, 1)).
+    """
+
+    def __init__(self, *limits):
+        self.limits = limits
+        self._window = max(period for _, period in limits)
+        self._calls = deque()  # Start times of the calls inside the longest window
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a call is allowed."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] >= self._window:
+                    self._calls.popleft()
+                wait = 0.0
+                for max_calls, period in self.limits:
+                    recent = [t for t in self._calls if now - t < period]
+                    if len(recent) >= max_calls:
+                        # Wait until the oldest of the last max_calls calls leaves the window
+                        wait = max(wait, recent[-max_calls] + period - now)
+                if wait <= 0:
+                    self._calls.append(now)
+                    return
+            time.sleep(wait)
+
+def request_key(url, params, headers):
+    parts = [url, repr(sorted((params or {}).items())), repr(sorted((headers or {}).items()))]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+# --- Requests ---
+def fetch_json(endpoint, url, params=None, headers=None, limiter=None, retries=True, timeout=HTTP_TIMEOUT):
+    """
+    GETs url through the shared session and returns (status code, parsed JSON or None).
+    Successful responses are cached for ENDPOINT_TTLS[endpoint] seconds; an optional
+    RateLimiter is only consulted for upstream requests. Network errors raise
+    requests.RequestException after the retries are used up; a 429 comes back at once.
+    Pass retries=False with a limiter so no attempt goes upstream without passing it, and
+    a shorter timeout where the caller has a deadline of its own.
+    """
+    ttl = ENDPOINT_TTLS.get(endpoint)
+    cache = _endpoint_cache(endpoint) if ttl else None
+    key = request_key(url, params, headers) if cache else None
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            _record(endpoint, hits=1)
+            return 200, cached
+    if limiter is not None:
+        limiter.acquire()
+    started = time.perf_counter()
+    try:
+        response = get_session(retries).get(url, params=params, headers=headers, timeout=timeout)
+    except requests.RequestException:
+        _record(endpoint, requests=1, errors=1, seconds=time.perf_counter() - started)
+        raise
+    _record(endpoint, requests=1, errors=int(response.status_code != 200), seconds=time.perf_counter() - started)
+    try:
+        data = response.json()
+    except ValueError:
+        data = None
+    if cache is not None and response.status_code == 200 and data is not None:
+        cache.set(key, data)
+    return response.status_code, data
+
+def http_stats():
+    """Per-endpoint cache hits, upstream requests/errors, hit rate and mean upstream latency."""
+    with _stats_lock:
+        report = {}
+        for endpoint, stats in _stats.items():
+            lookups = stats["hits"] + stats["requests"]
+            report[endpoint] = dict(
+                stats,
+                hit_rate=stats["hits"] / lookups if lookups else 0.0,
+                avg_latency=stats["seconds"] / stats["requests"] if stats["requests"] else 0.0,
+            )
+        return report
+
+def format_http_stats():
+    """One-line summary of http_stats() for the sidebar."""
+    report = http_stats()
+    if not report:
+        return "HTTP: no requests yet"
+    return "HTTP: " + ", ".join(
+        f"{endpoint} {stats['hit_rate']:.0%} cached, {stats['avg_latency'] * 1000:.0f} ms"
+        for endpoint, stats in sorted(report.items())
+    )
@@ -0,0 +1,175 @@
+import io
+import os
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+from PIL import Image, ImageOps, ImageSequence
+import pytesseract
+from ttl_cache import TTLCache
+
+# Each Tesseract process is single-threaded; parallelism comes from running several at once
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+# --- OCR Settings ---
+OCR_WORKERS = max(1, os.cpu_count() or 2)
+OCR_TARGET_DPI = 300          # Scans with known DPI are rescaled to this
+OCR_MIN_SIDE = 1000           # Images without DPI info are upscaled to at least this (px, longest side)
+OCR_MAX_SIDE = 4000           # ... and downscaled to at most this
+OCR_MAX_UPSCALE = 2.0         # Screenshots often claim 72/96 DPI; don't blow them up further than this
+OCR_DESKEW = True
+OCR_MAX_SKEW = 5.0            # Degrees searched either side of level
+OCR_SKEW_STEP = 0.5
+OCR_VERSION = 2               # Bump when preprocessing changes to invalidate cached results
+OCR_CACHE_SIZE = 1024         # Pages kept in memory
+OCR_CACHE_PATH = None         # e.g. os.path.join(os.path.expanduser("~"), ".ocr_cache.db")
+
+# --- Process-wide OCR Result Cache (shared by Astra and Vertex) ---
+ocr_cache = TTLCache(max_entries=OCR_CACHE_SIZE, db_path=OCR_CACHE_PATH)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Returns the shared thread pool; each thread drives one Tesseract process."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=OCR_WORKERS, thread_name_prefix="ocr")
+        return _pool
+
+# --- Preprocessing ---
+def estimate_skew(gray):
+    """Returns the rotation (degrees) that makes text rows most sharply defined."""
+    thumb = gray.copy()
+    thumb.thumbnail((800, 800))
+    ink = ImageOps.invert(thumb).point(lambda v: 255 if v > 96 else 0)
+    steps = int(OCR_MAX_SKEW / OCR_SKEW_STEP)
+    # Smallest angles first, so blank or ambiguous pages are left level
+    angles = sorted((step * OCR_SKEW_STEP for step in range(-steps, steps + 1)), key=abs)
+    best_angle, best_score = 0.0, None
+    for angle in angles:
+        rows = np.asarray(ink.rotate(angle, expand=False), dtype=np.float32).sum(axis=1)
+        score = float(np.var(rows))
+        if best_score is None or score > best_score:
+            best_angle, best_score = angle, score
+    return best_angle
+
+def preprocess_image(image):
+    """Grayscale, rescale to a sensible resolution, stretch contrast and straighten."""
+    image = ImageOps.exif_transpose(image).convert("L")
+    dpi = image.info.get("dpi")
+    longest = max(image.size)
+    if dpi and dpi[0] and abs(dpi[0] - OCR_TARGET_DPI) > OCR_TARGET_DPI * 0.1:
+        scale = OCR_TARGET_DPI / float(dpi[0])
+    elif longest > OCR_MAX_SIDE:
+        scale = OCR_MAX_SIDE / longest
+    elif longest < OCR_MIN_SIDE:
+        scale = OCR_MIN_SIDE / longest
+    else:
+        scale = 1.0
+    scale = min(scale, OCR_MAX_UPSCALE, OCR_MAX_SIDE / longest)
+    if abs(scale - 1.0) > 0.05:
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = image.resize(size, Image.LANCZOS)
+    image = ImageOps.autocontrast(image)
+    if OCR_DESKEW:
+        angle = estimate_skew(image)
+        if abs(angle) >= OCR_SKEW_STEP:
+            image = image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+    return image
+
+# --- Recognition ---
+def iter_frames(data):
+    """Yields each page of an image as a separate image (multi-page TIFFs have several)."""
+    with Image.open(io.BytesIO(data)) as image:
+        for frame in ImageSequence.Iterator(image):
+            page = frame.copy()
+            page.info.setdefault("dpi", image.info.get("dpi"))
+            yield page
+
+def ocr_key(digest, page_num, lang):
+    return f"v{OCR_VERSION}:{lang}:{digest}:{page_num}"
+
+def ocr_page(image, lang="eng"):
+    """Worker entry point: preprocesses one page and returns its text."""
+    return pytesseract.image_to_string(preprocess_image(image), lang=lang).strip()
+
+def _file_bytes(source):
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+    if hasattr(source, "read"):
+        source.seek(0)
+        return source.read()
+    with open(source, "rb") as file:
+        return file.read()
+
+def _page_tasks(items, lang, results):
+    """Yields (name, page_num, image) for every page not already cached."""
+    for name, data in items:
+        try:
+            digest = hashlib.sha256(data).hexdigest()
+            results[name] = {"digest": digest, "pages": {}, "count": None, "error": None}
+            page_num = -1
+            for page_num, frame in enumerate(iter_frames(data)):
+                cached = ocr_cache.get(ocr_key(digest, page_num, lang))
+                if cached is not None:
+                    results[name]["pages"][page_num] = cached
+                else:
+                    yield name, page_num, frame
+            results[name]["count"] = page_num + 1
+        except Exception as e:
+            results[name]["error"] = str(e)
+            results[name]["count"] = len(results[name]["pages"])
+
+def _finished(entry):
+    return entry["count"] is not None and (entry["error"] or len(entry["pages"]) == entry["count"])
+
+def batch_ocr(items, lang="eng", workers=None):
+    """
+    OCRs (name, source) items, where source is a path, file object or bytes, with every
+    page of every image spread across the pool. Pages are cached by image hash, so
+    re-uploads skip Tesseract. Yields (name, text, error) as each file finishes.
+    """
+    items = [(name, _file_bytes(source)) for name, source in items]
+    pool = get_pool()
+    limit = 2 * (workers or OCR_WORKERS)
+    results = {}
+    tasks = _page_tasks(items, lang, results)
+    in_flight = {}
+    reported = set()
+    pending = True
+    while pending or in_flight:
+        while pending and len(in_flight) < limit:
+            task = next(tasks, None)
+            if task is None:
+                pending = False
+                break
+            name, page_num, frame = task
+            in_flight[pool.submit(ocr_page, frame, lang)] = (name, page_num)
+        if in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, page_num = in_flight.pop(future)
+                entry = results[name]
+                try:
+                    text = future.result()
+                    entry["pages"][page_num] = text
+                    ocr_cache.set(ocr_key(entry["digest"], page_num, lang), text)
+                except Exception as e:
+                    entry["error"] = str(e)
+        for name, entry in results.items():
+            if name not in reported and _finished(entry) and not any(n == name for n, _ in in_flight.values()):
+                reported.add(name)
+                text = "\n\n".join(entry["pages"][p] for p in sorted(entry["pages"]))
+                yield name, text, entry["error"]
+
+def ocr_file(source, lang="eng"):
+    """OCRs a single image (all pages of a multi-page TIFF). Raises on failure."""
+    for _, text, error in batch_ocr([("image", source)], lang=lang):
+        if error:
+            raise RuntimeError(error)
+        return text
+    return ""
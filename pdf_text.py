@@ -0,0 +1,216 @@
+import os
+import time
+import hashlib
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait
+import fitz  # PyMuPDF for PDF files
+from PIL import Image
+from ocr import OCR_VERSION, OCR_WORKERS, ocr_cache, ocr_page, get_pool as get_ocr_pool
+
+# --- PDF Extraction Settings ---
+PDF_PARALLEL_MIN_PAGES = 64   # Smaller page ranges are extracted in-process
+PDF_PAGES_PER_TASK = 32       # Pages handed to a worker process at a time
+PDF_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+# --- Scanned Page OCR Settings ---
+PDF_OCR_FALLBACK = True   # OCR pages that have images but (almost) no text layer
+PDF_OCR_MIN_CHARS = 25    # Pages with fewer non-blank characters than this count as scanned
+PDF_OCR_DPI = 300         # Resolution scanned pages are rasterized at
+PDF_OCR_LANG = "eng"
+
+# Running totals of OCR work done for scanned pages, for reporting the extra cost
+ocr_totals = {"pages": 0, "cached": 0, "seconds": 0.0, "failed": 0}
+_totals_lock = threading.Lock()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Returns the shared process pool used for parallel page extraction."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+        return _pool
+
+# --- PDF Helpers ---
+def pdf_source(file_path_or_buffer):
+    """Returns a path or the raw bytes of an uploaded PDF, suitable for open_pdf()."""
+    if hasattr(file_path_or_buffer, "read"):
+        if hasattr(file_path_or_buffer, "seek"):
+            file_path_or_buffer.seek(0)
+        return file_path_or_buffer.read()
+    return file_path_or_buffer
+
+def open_pdf(source):
+    if isinstance(source, (bytes, bytearray)):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source)
+
+def pdf_page_count(source):
+    with open_pdf(source) as doc:
+        return doc.page_count
+
+def resolve_page_range(page_count, page_range=None, max_pages=None):
+    """Clamps an optional (start, stop) page range and page limit to the document."""
+    start, stop = page_range if page_range else (0, page_count)
+    start = max(0, start)
+    stop = min(page_count, stop if stop is not None else page_count)
+    if max_pages is not None:
+        stop = min(stop, start + max_pages)
+    return start, max(start, stop)
+
+def is_scanned(page, text):
+    """A page with images but next to no extractable text is treated as a scan."""
+    return len("".join(text.split())) < PDF_OCR_MIN_CHARS and bool(page.get_images(full=False))
+
+def page_text(page, ocr_fallback=False):
+    """Returns the page's text layer, or None if it looks scanned and ocr_fallback is set."""
+    text = page.get_text()
+    return None if ocr_fallback and is_scanned(page, text) else text
+
+def extract_page_range(source, start, stop, ocr_fallback=False):
+    """Worker entry point: returns the text of pages [start, stop) (None for scanned pages)."""
+    with open_pdf(source) as doc:
+        return [page_text(doc.load_page(page_num), ocr_fallback) for page_num in range(start, min(stop, doc.page_count))]
+
+# --- Scanned Page OCR ---
+def source_key(source):
+    """Identifies a PDF for the OCR cache: content hash for bytes, path + mtime + size for files."""
+    if isinstance(source, (bytes, bytearray)):
+        return hashlib.sha256(source).hexdigest()
+    info = os.stat(source)
+    return f"{os.path.abspath(source)}:{info.st_mtime_ns}:{info.st_size}"
+
+def render_page(page):
+    """Rasterizes a page to a grayscale PIL image at PDF_OCR_DPI."""
+    pix = page.get_pixmap(dpi=PDF_OCR_DPI, colorspace=fitz.csGRAY, alpha=False)
+    image = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    image.info["dpi"] = (PDF_OCR_DPI, PDF_OCR_DPI)
+    return image
+
+def _record(stats, field, amount):
+    with _totals_lock:
+        ocr_totals[field] += amount
+        if stats is not None:
+            stats[field] = stats.get(field, 0) + amount
+
+def _ocr_scanned_page(image, key, render_seconds, stats):
+    started = time.perf_counter()
+    text = ocr_page(image, PDF_OCR_LANG)
+    ocr_cache.set(key, text)
+    _record(stats, "pages", 1)
+    _record(stats, "seconds", render_seconds + time.perf_counter() - started)
+    return text
+
+def _resolve(item, doc, stats):
+    page_num, text = item
+    if isinstance(text, str):
+        return text
+    try:
+        return text.result()
+    except Exception:
+        # OCR failed (e.g. Tesseract missing): keep whatever text layer the page has
+        _record(stats, "failed", 1)
+        return doc.load_page(page_num).get_text()
+
+# --- Page-streaming Extraction ---
+def iter_pdf_pages(source, page_range=None, max_pages=None, parallel=None, ocr_fallback=None, stats=None):
+    """
+    Yields the text of each page in order. source is a path or the PDF bytes. Large
+    ranges are split across a process pool with a bounded number of chunks in flight,
+    so memory stays flat however long the document is.
+
+    Scanned pages (see is_scanned) are rasterized and OCR'd concurrently when
+    ocr_fallback is on (PDF_OCR_FALLBACK by default); their text is cached per page, and
+    OCR page counts and seconds are added to stats (if given) and ocr_totals. A page
+    whose OCR fails falls back to its text layer instead of failing the whole read.
+    """
+    if ocr_fallback is None:
+        ocr_fallback = PDF_OCR_FALLBACK
+    pages = _iter_text_layer(source, page_range, max_pages, parallel, ocr_fallback)
+    if not ocr_fallback:
+        for _, text in pages:
+            yield text
+        return
+
+    doc, key_prefix = None, None
+    pending = deque()  # Page texts and OCR futures, in page order
+    try:
+        for page_num, text in pages:
+            if text is None:
+                if doc is None:
+                    doc = open_pdf(source)
+                    key_prefix = f"pdf:v{OCR_VERSION}:{PDF_OCR_DPI}:{PDF_OCR_LANG}:{source_key(source)}"
+                key = f"{key_prefix}:{page_num}"
+                text = ocr_cache.get(key)
+                if text is not None:
+                    _record(stats, "cached", 1)
+                else:
+                    # PyMuPDF is not thread-safe, so pages are rendered here and only OCR runs in the pool
+                    page = doc.load_page(page_num)
+                    started = time.perf_counter()
+                    try:
+                        image = render_page(page)
+                    except Exception:
+                        _record(stats, "failed", 1)
+                        text = page.get_text()
+                    else:
+                        text = get_ocr_pool().submit(
+                            _ocr_scanned_page, image, key, time.perf_counter() - started, stats
+                        )
+            pending.append((page_num, text))
+            while pending and (
+                isinstance(pending[0][1], str) or pending[0][1].done() or len(pending) > OCR_WORKERS * 2
+            ):
+                yield _resolve(pending.popleft(), doc, stats)
+        while pending:
+            yield _resolve(pending.popleft(), doc, stats)
+    finally:
+        pages.close()
+        for _, item in pending:
+            if not isinstance(item, str):
+                item.cancel()
+        if doc is not None:
+            doc.close()
+
+def _iter_text_layer(source, page_range, max_pages, parallel, ocr_fallback):
+    """Yields (page number, text layer or None if scanned) in page order."""
+    with open_pdf(source) as doc:
+        start, stop = resolve_page_range(doc.page_count, page_range, max_pages)
+        if parallel is None:
+            parallel = stop - start >= PDF_PARALLEL_MIN_PAGES and PDF_WORKERS > 1
+        if not parallel:
+            for page_num in range(start, stop):
+                yield page_num, page_text(doc.load_page(page_num), ocr_fallback)
+            return
+
+    temp_path = None
+    if isinstance(source, (bytes, bytearray)):
+        # Hand workers a file path instead of pickling the whole document to each of them
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as temp_file:
+            temp_file.write(source)
+            temp_path = source = temp_file.name
+
+    pool = get_pool()
+    ranges = deque((s, min(s + PDF_PAGES_PER_TASK, stop)) for s in range(start, stop, PDF_PAGES_PER_TASK))
+    in_flight = deque()
+    try:
+        while ranges or in_flight:
+            while ranges and len(in_flight) < PDF_WORKERS * 2:
+                range_start, range_stop = ranges.popleft()
+                in_flight.append((range_start, pool.submit(extract_page_range, source, range_start, range_stop, ocr_fallback)))
+            range_start, future = in_flight.popleft()
+            for offset, text in enumerate(future.result()):
+                yield range_start + offset, text
+    finally:
+        for _, future in in_flight:
+            future.cancel()
+        if temp_path:
+            wait([future for _, future in in_flight if not future.cancelled()])
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
@@ -0,0 +1,96 @@
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pandas as pd
+from http_client import fetch_json, RateLimiter
+
+# --- Stock Watchlist Settings ---
+QUOTE_WORKERS = 8
+FINNHUB_CALLS_PER_MINUTE = 60    # Finnhub free-tier limit, over any 60 seconds
+FINNHUB_CALLS_PER_SECOND = 30    # Finnhub also caps calls at 30 per second
+WATCHLIST_MAX_SYMBOLS = 100
+QUOTE_COLUMNS = ["Symbol", "Price", "Change", "Change %", "Open", "High", "Low", "Prev Close", "Status"]
+
+# Shared by every session, since the limit applies to the API key
+finnhub_limiter = RateLimiter((FINNHUB_CALLS_PER_MINUTE, 60.0), (FINNHUB_CALLS_PER_SECOND, 1.0))
+
+SYMBOL_PATTERN = re.compile(r"^[A-Z0-9][A-Z0-9.:\-]{0,14}$")
+
+def parse_symbols(text):
+    """Splits a comma/space separated list into unique upper-case symbols, in order."""
+    symbols = []
+    for token in re.split(r"[\s,;]+", text.upper()):
+        if token and SYMBOL_PATTERN.match(token) and token not in symbols:
+            symbols.append(token)
+    return symbols[:WATCHLIST_MAX_SYMBOLS]
+
+# --- Quote Fetching ---
+def fetch_quote(symbol, api_key):
+    """Returns one watchlist row (a dict keyed by QUOTE_COLUMNS) for symbol."""
+    row = dict.fromkeys(QUOTE_COLUMNS)
+    row["Symbol"] = symbol
+    try:
+        # No transport retries: each of them would be a call the limiter never saw
+        params = {"symbol": symbol, "token": api_key}
+        status, data = fetch_json("quote", "https://finnhub.io/api/v1/quote", params=params,
+                                  limiter=finnhub_limiter, retries=False)
+    except Exception as e:
+        row["Status"] = f"Error: {e}"
+        return row
+    if status == 429:
+        row["Status"] = "Rate limited"
+    elif status != 200 or not data:
+        row["Status"] = f"Error: HTTP {status}"
+    elif not data.get("c") and not data.get("pc"):
+        # Finnhub answers unknown symbols with all-zero quotes
+        row["Status"] = "Unknown symbol"
+    else:
+        row.update({
+            "Price": data.get("c"),
+            "Change": data.get("d"),
+            "Change %": data.get("dp"),
+            "Open": data.get("o"),
+            "High": data.get("h"),
+            "Low": data.get("l"),
+            "Prev Close": data.get("pc"),
+            "Status": "OK",
+        })
+    return row
+
+def iter_quotes(symbols, api_key, workers=QUOTE_WORKERS):
+    """Fetches quotes concurrently (within the Finnhub rate limit), yielding rows as they arrive."""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(fetch_quote, symbol, api_key) for symbol in symbols]
+        for future in as_completed(futures):
+            yield future.result()
+
+# --- Watchlist Table ---
+def refresh_watchlist(rows, symbols, api_key, on_change=None):
+    """
+    Updates rows (symbol -> row, kept between reruns) in place with fresh quotes for
+    symbols, dropping symbols no longer listed. A failed fetch keeps the last good quote
+    and only updates its Status. on_change(changed) is called only when a row's values
+    actually change. Returns the set of changed symbols.
+    """
+    for symbol in list(rows):
+        if symbol not in symbols:
+            del rows[symbol]
+    changed = set()
+    for row in iter_quotes(symbols, api_key):
+        previous = rows.get(row["Symbol"])
+        had_quote = previous is not None and previous["Price"] is not None
+        if had_quote and row["Price"] is None and row["Status"] != "Unknown symbol":
+            row = dict(previous, Status=f"{row['Status']} (last quote shown)")
+        if previous != row:
+            rows[row["Symbol"]] = row
+            changed.add(row["Symbol"])
+            if on_change:
+                on_change(changed)
+    return changed
+
+def watchlist_frame(rows, symbols, changed=()):
+    """Builds the watchlist table in symbol order, highlighting rows that just changed."""
+    frame = pd.DataFrame([rows[symbol] for symbol in symbols if symbol in rows], columns=QUOTE_COLUMNS)
+    highlight = "background-color: rgba(255, 200, 0, 0.2)"
+    return frame.style.apply(
+        lambda row: [highlight if row["Symbol"] in changed else "" for _ in row], axis=1
+    ).format(precision=2, na_rep="")
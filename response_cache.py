@@ -0,0 +1,47 @@
+import os
+import re
+import hashlib
+from ttl_cache import TTLCache
+
+# --- Response Cache Settings ---
+RESPONSE_CACHE_SIZE = 512       # Responses kept in memory
+RESPONSE_CACHE_TTL = 60 * 60    # Seconds a cached response stays valid
+RESPONSE_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".chatbot_response_cache.db")  # None = memory only
+
+# Prompts whose answer depends on when they are asked are never cached. "time" is matched
+# as a question ("what time", "time is it") so Vertex's "time management" prompt still caches.
+TIME_SENSITIVE_PATTERN = re.compile(
+    r"\b(today|tonight|tomorrow|yesterday|now|latest|current|currently|recent|recently|date|"
+    r"this (week|month|year)|what time|time is it|time now)\b",
+    re.IGNORECASE,
+)
+
+# --- Process-wide Gemini Response Cache (shared by Astra and Vertex) ---
+response_cache = TTLCache(
+    max_entries=RESPONSE_CACHE_SIZE,
+    ttl=RESPONSE_CACHE_TTL,
+    db_path=RESPONSE_CACHE_PATH,
+)
+
+def normalize_prompt(prompt):
+    """Collapses whitespace so trivially different prompts share an entry (case is kept: "US" is not "us")."""
+    return " ".join(prompt.split())
+
+def is_time_sensitive(prompt):
+    return TIME_SENSITIVE_PATTERN.search(prompt) is not None
+
+def response_key(model_name, prompt):
+    normalized = normalize_prompt(prompt)
+    return hashlib.sha256(f"{model_name}\0{normalized}".encode("utf-8")).hexdigest()
+
+def get_cached_response(model_name, prompt):
+    """Returns the cached response for this model and prompt, or None."""
+    if is_time_sensitive(prompt):
+        return None
+    return response_cache.get(response_key(model_name, prompt))
+
+def cache_response(model_name, prompt, response):
+    """Stores a complete answer; empty answers and time-sensitive prompts are not cached."""
+    if not response or not response.strip() or is_time_sensitive(prompt):
+        return
+    response_cache.set(response_key(model_name, prompt), response)
@@ -0,0 +1,212 @@
+import os
+import json
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import speech_recognition as sr
+from pydub import AudioSegment
+from pydub.silence import detect_silence
+
+# --- Audio Transcription Settings ---
+SPEECH_SAMPLE_RATE = 16000     # Recognizers want 16 kHz mono 16-bit PCM
+CHUNK_MAX_MS = 30000           # Upper bound on a chunk; the web recognizer rejects long requests
+CHUNK_MIN_MS = 8000            # Chunks are not cut shorter than this unless the audio ends
+SILENCE_MIN_MS = 400           # Pauses at least this long are candidate cut points
+SILENCE_THRESH_DB = -16        # Silence threshold relative to the clip's average loudness
+SILENCE_SEEK_MS = 10           # Scan step when looking for pauses (1 ms is needlessly slow)
+TRANSCRIBE_WORKERS = min(8, (os.cpu_count() or 2) * 2)  # Recognition is mostly network wait
+
+# --- Offline Recognition Settings ---
+# Vosk model folder, e.g. vosk-model-small-en-us-0.15 from https://alphacephei.com/vosk/models
+VOSK_MODEL_PATH = os.path.join(os.path.expanduser("~"), ".vosk", "vosk-model-small-en-us-0.15")
+LOCAL_SPEECH_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+SPEECH_BACKEND_GOOGLE = "Google (online)"
+SPEECH_BACKEND_LOCAL = "Vosk (offline)"
+SPEECH_BACKENDS = [SPEECH_BACKEND_GOOGLE, SPEECH_BACKEND_LOCAL]
+
+# These helpers raise instead of reporting through Streamlit; the UI wrappers live in the bots.
+
+def load_audio(source):
+    """Decodes an upload (path or file object) to 16 kHz mono 16-bit audio."""
+    if hasattr(source, "seek"):
+        source.seek(0)
+    # Passing the format lets pydub read WAV uploads directly instead of through ffmpeg
+    name = source if isinstance(source, str) else getattr(source, "name", "")
+    audio = AudioSegment.from_file(source, format=os.path.splitext(name)[1][1:].lower() or None)
+    return audio.set_channels(1).set_frame_rate(SPEECH_SAMPLE_RATE).set_sample_width(2)
+
+def split_audio(audio):
+    """
+    Cuts audio into chunks of at most CHUNK_MAX_MS, preferring the middle of pauses.
+    Unlike pydub's split_on_silence nothing is dropped, so no words are lost at the cuts.
+    """
+    if len(audio) <= CHUNK_MAX_MS:
+        return [audio]
+    thresh = audio.dBFS + SILENCE_THRESH_DB
+    pauses = [
+        (start + end) // 2
+        for start, end in detect_silence(audio, SILENCE_MIN_MS, thresh, seek_step=SILENCE_SEEK_MS)
+    ]
+    chunks, start = [], 0
+    while len(audio) - start > CHUNK_MAX_MS:
+        limit = start + CHUNK_MAX_MS
+        candidates = [cut for cut in pauses if start + CHUNK_MIN_MS <= cut <= limit]
+        cut = candidates[-1] if candidates else limit
+        chunks.append(audio[start:cut])
+        start = cut
+    chunks.append(audio[start:])
+    return chunks
+
+def to_audio_data(segment):
+    return sr.AudioData(segment.raw_data, segment.frame_rate, segment.sample_width)
+
+def recognize_google(audio_data):
+    """Default backend: Google's web recognizer. Returns "" for chunks with no speech."""
+    try:
+        return sr.Recognizer().recognize_google(audio_data)
+    except sr.UnknownValueError:
+        return ""
+
+# --- Offline Backend (Vosk in worker processes) ---
+_local_model = None  # Loaded once in each worker process
+_local_pool = None
+_local_pool_lock = threading.Lock()
+_local_warmed = False
+
+def _load_local_model(model_path):
+    """Worker initializer: loads the Vosk model so every later chunk reuses it."""
+    global _local_model
+    from vosk import Model, SetLogLevel
+    SetLogLevel(-1)
+    _local_model = Model(model_path)
+
+def _local_ready():
+    return _local_model is not None
+
+def recognize_local_chunk(frame_data, sample_rate):
+    """Worker entry point: recognizes 16-bit mono PCM with the worker's warm model."""
+    from vosk import KaldiRecognizer
+    recognizer = KaldiRecognizer(_local_model, sample_rate)
+    recognizer.AcceptWaveform(frame_data)
+    return json.loads(recognizer.FinalResult()).get("text", "")
+
+def local_backend_error():
+    """Returns why the offline backend can't run, or None if it can."""
+    if importlib.util.find_spec("vosk") is None:
+        return "Offline recognition needs the vosk package (pip install vosk)."
+    if not os.path.isdir(VOSK_MODEL_PATH):
+        return f"Vosk model not found at {VOSK_MODEL_PATH}."
+    return None
+
+def get_local_pool():
+    """Returns the process pool whose workers hold the loaded Vosk model."""
+    global _local_pool
+    with _local_pool_lock:
+        if _local_pool is None:
+            _local_pool = ProcessPoolExecutor(
+                max_workers=LOCAL_SPEECH_WORKERS,
+                initializer=_load_local_model,
+                initargs=(VOSK_MODEL_PATH,),
+            )
+        return _local_pool
+
+def reset_local_pool(pool):
+    """Drops a broken pool (e.g. the model failed to load) so the next call starts fresh workers."""
+    global _local_pool, _local_warmed
+    with _local_pool_lock:
+        if _local_pool is pool:
+            _local_pool = None
+            _local_warmed = False
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def warm_local_backend():
+    """Starts the workers and loads the model in the background, ahead of the first request."""
+    global _local_warmed
+    if _local_warmed:
+        return
+    _local_warmed = True
+    pool = get_local_pool()
+    try:
+        for _ in range(LOCAL_SPEECH_WORKERS):
+            pool.submit(_local_ready)
+    except BrokenProcessPool:
+        reset_local_pool(pool)
+
+def recognize_local(audio_data):
+    """Offline backend: runs Vosk in a worker process. Returns "" for chunks with no speech."""
+    error = local_backend_error()
+    if error:
+        raise RuntimeError(error)
+    frame_data = audio_data.get_raw_data(convert_rate=SPEECH_SAMPLE_RATE, convert_width=2)
+    pool = get_local_pool()
+    try:
+        return pool.submit(recognize_local_chunk, frame_data, SPEECH_SAMPLE_RATE).result()
+    except BrokenProcessPool:
+        reset_local_pool(pool)
+        raise RuntimeError("The offline speech workers stopped unexpectedly (was the Vosk model loadable?). Please try again.")
+
+def get_recognizer(backend):
+    """Maps a SPEECH_BACKENDS name to its recognize(audio_data) function."""
+    return recognize_local if backend == SPEECH_BACKEND_LOCAL else recognize_google
+
+# --- Chunked Transcription ---
+def format_timestamp(ms):
+    """m:ss (or h:mm:ss) for an offset into the recording."""
+    minutes, seconds = divmod(int(ms) // 1000, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+def inaudible_marker(start_ms, end_ms):
+    return f"[inaudible {format_timestamp(start_ms)}\u2013{format_timestamp(end_ms)}]"
+
+def iter_transcript(chunks, recognize=recognize_google, workers=TRANSCRIBE_WORKERS):
+    """
+    Transcribes audio chunks concurrently. After each chunk finishes, yields
+    (chunks done, chunk count, text so far, chunks failed) where the text stitches the
+    finished chunks in order. A chunk that fails is marked "[inaudible m:ss-m:ss]" with
+    its place in the recording; if every chunk fails the first error is raised.
+    """
+    texts = [None] * len(chunks)
+    spans, start = [], 0
+    for chunk in chunks:
+        spans.append((start, start + len(chunk)))
+        start += len(chunk)
+    errors = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(recognize, to_audio_data(chunk)): index for index, chunk in enumerate(chunks)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            index = futures[future]
+            try:
+                texts[index] = future.result().strip()
+            except Exception as e:
+                texts[index] = inaudible_marker(*spans[index])
+                errors.append(e)
+            yield done, len(chunks), stitch(texts), len(errors)
+    if errors and len(errors) == len(chunks):
+        raise errors[0]
+
+def stitch(texts):
+    """Joins chunk texts in order; chunks still in progress show as an ellipsis."""
+    parts = []
+    for text in texts:
+        if text is None:
+            if not parts or parts[-1] != "...":
+                parts.append("...")
+        elif text:
+            parts.append(text)
+    return " ".join(parts).strip()
+
+def transcribe(source, recognize=recognize_google, on_progress=None):
+    """
+    Decodes, splits and transcribes an audio file. on_progress gets each iter_transcript
+    tuple. Returns (text, number of chunks that failed and are marked inaudible).
+    """
+    chunks = split_audio(load_audio(source))
+    text, failed = "", 0
+    for progress in iter_transcript(chunks, recognize):
+        text, failed = progress[2], progress[3]
+        if on_progress:
+            on_progress(*progress)
+    return text, failed
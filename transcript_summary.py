@@ -0,0 +1,110 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# --- Transcript Summarization Settings ---
+SUMMARY_CHUNK_TOKENS = 3000     # Transcript tokens per map prompt
+SUMMARY_REDUCE_TOKENS = 6000    # Partial-summary tokens per reduce prompt
+SUMMARY_WORKERS = 4             # Concurrent LLM calls
+
+def estimate_tokens(text):
+    # Rough estimate (~4 characters per token); avoids a tokenizer dependency
+    return len(text) // 4 + 1
+
+def format_timestamp(seconds):
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+# --- Chunking ---
+def chunk_segments(segments, max_tokens=SUMMARY_CHUNK_TOKENS):
+    """
+    Groups transcript segments ({"text", "start", "duration"}) into chunks of about
+    max_tokens, never splitting a segment. Each chunk is (start seconds, end seconds, text)
+    with every line prefixed by its [timestamp].
+    """
+    chunks, lines, tokens, start, end = [], [], 0, None, 0
+    for segment in segments:
+        text = " ".join(segment["text"].split())
+        if not text:
+            continue
+        line = f"[{format_timestamp(segment['start'])}] {text}"
+        line_tokens = estimate_tokens(line)
+        if lines and tokens + line_tokens > max_tokens:
+            chunks.append((start, end, "\n".join(lines)))
+            lines, tokens, start = [], 0, None
+        if start is None:
+            start = segment["start"]
+        lines.append(line)
+        tokens += line_tokens
+        end = segment["start"] + segment.get("duration", 0)
+    if lines:
+        chunks.append((start, end, "\n".join(lines)))
+    return chunks
+
+def time_range(start, end):
+    return f"{format_timestamp(start)}-{format_timestamp(end)}"
+
+# --- Prompts ---
+def map_prompt(chunk, whole=False):
+    start, end, text = chunk
+    if whole:
+        task = "Summarize this YouTube video transcript into a short overview paragraph followed by key points."
+    else:
+        task = f"Summarize this part ({time_range(start, end)}) of a YouTube video transcript into concise key points."
+    return f"{task} Start each point with the [timestamp] where it is discussed.\n\n{text}\n\nKey points:"
+
+def reduce_prompt(parts, final):
+    sections = "\n\n".join(f"Part {time_range(start, end)}:\n{summary}" for start, end, summary in parts)
+    shape = (
+        "a short overview paragraph followed by the key points in chronological order"
+        if final else "key points in chronological order"
+    )
+    return (
+        "Below are summaries of consecutive parts of one YouTube video. Merge them into "
+        f"{shape}, dropping repetition. Keep the [timestamp] at the start of each key point.\n\n"
+        f"{sections}\n\nSummary:"
+    )
+
+# --- Map-Reduce Summarization ---
+def summarize_segments(segments, generate, on_partial=None, workers=SUMMARY_WORKERS):
+    """
+    Summarizes a timestamped transcript with generate(prompt) -> text. Chunks are
+    summarized concurrently; on_partial(done, total, text) receives the finished chunk
+    summaries in order as they arrive. The partial summaries are then merged (in rounds,
+    if they don't fit one prompt) into a final summary with timestamp anchors.
+    """
+    chunks = chunk_segments(segments)
+    if not chunks:
+        return ""
+    if len(chunks) == 1:
+        return generate(map_prompt(chunks[0], whole=True)).strip()
+
+    partials = [None] * len(chunks)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(generate, map_prompt(chunk)): index for index, chunk in enumerate(chunks)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            index = futures[future]
+            start, end, _ = chunks[index]
+            partials[index] = (start, end, future.result().strip())
+            if on_partial:
+                finished = "\n\n".join(
+                    f"**{time_range(s, e)}**\n{summary}" for s, e, summary in (p for p in partials if p)
+                )
+                on_partial(done, len(chunks), finished)
+
+        # Reduce in rounds until the partial summaries fit in one prompt
+        while estimate_tokens("\n\n".join(summary for _, _, summary in partials)) > SUMMARY_REDUCE_TOKENS:
+            groups, group, tokens = [], [], 0
+            for part in partials:
+                part_tokens = estimate_tokens(part[2])
+                if group and tokens + part_tokens > SUMMARY_REDUCE_TOKENS:
+                    groups.append(group)
+                    group, tokens = [], 0
+                group.append(part)
+                tokens += part_tokens
+            groups.append(group)
+            if len(groups) == len(partials):
+                break  # Each part alone is over budget; merge what we have
+            merged = pool.map(lambda group: generate(reduce_prompt(group, final=False)).strip(), groups)
+            partials = [(group[0][0], group[-1][1], summary) for group, summary in zip(groups, merged)]
+    return generate(reduce_prompt(partials, final=True)).strip()
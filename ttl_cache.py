@@ -0,0 +1,120 @@
+import time
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# --- Thread-safe LRU + TTL Cache ---
+class TTLCache:
+    """
+    In-memory LRU cache with per-entry expiry, hit/miss/eviction counters and an optional
+    SQLite tier so entries survive restarts. Safe to share between sessions and threads.
+    """
+
+    def __init__(self, max_entries=256, ttl=None, db_path=None, max_disk_entries=None, max_bytes=None, size_of=None):
+        self.max_entries = max_entries
+        self.ttl = ttl  # Seconds; None means entries only leave through LRU eviction
+        self.max_disk_entries = max_disk_entries or max_entries * 8
+        self.max_bytes = max_bytes  # Optional memory budget, measured with size_of(value)
+        self.size_of = size_of or (lambda value: 0)
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()  # key -> (expires_at, value, size)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.conn = None
+        if db_path:
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB, expires REAL, stored REAL)"
+            )
+            self.conn.execute("DELETE FROM entries WHERE expires IS NOT NULL AND expires < ?", (time.time(),))
+            self.conn.commit()
+
+    def _expiry(self, ttl):
+        ttl = self.ttl if ttl is None else ttl
+        return time.time() + ttl if ttl is not None else None
+
+    def _store(self, key, expires, value):
+        self._discard(key)
+        size = self.size_of(value)
+        self._data[key] = (expires, value, size)
+        self.total_bytes += size
+        while len(self._data) > self.max_entries or (
+            self.max_bytes is not None and self.total_bytes > self.max_bytes and len(self._data) > 1
+        ):
+            _, (_, _, evicted_size) = self._data.popitem(last=False)
+            self.total_bytes -= evicted_size
+            self.evictions += 1
+
+    def _discard(self, key):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[2]
+
+    def get(self, key, default=None):
+        """Returns the cached value for key, or default if missing or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires, value, _ = entry
+                if expires is None or expires > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._discard(key)
+            if self.conn is not None:
+                row = self.conn.execute("SELECT value, expires FROM entries WHERE key = ?", (key,)).fetchone()
+                if row is not None and (row[1] is None or row[1] > now):
+                    value = pickle.loads(row[0])
+                    self._store(key, row[1], value)
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        """Stores value under key; ttl overrides the cache-wide default for this entry."""
+        expires = self._expiry(ttl)
+        with self._lock:
+            self._store(key, expires, value)
+            if self.conn is not None:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                    (key, pickle.dumps(value), expires, time.time()),
+                )
+                self._writes += 1
+                if self._writes % 100 == 0:
+                    self._prune_disk()
+                self.conn.commit()
+
+    def _prune_disk(self):
+        self.conn.execute("DELETE FROM entries WHERE expires IS NOT NULL AND expires < ?", (time.time(),))
+        self.conn.execute(
+            "DELETE FROM entries WHERE key NOT IN (SELECT key FROM entries ORDER BY stored DESC LIMIT ?)",
+            (self.max_disk_entries,),
+        )
+
+    def clear(self):
+        """Drops every entry from both tiers."""
+        with self._lock:
+            self._data.clear()
+            self.total_bytes = 0
+            if self.conn is not None:
+                self.conn.execute("DELETE FROM entries")
+                self.conn.commit()
+
+    def stats(self):
+        """Returns size and hit/miss/eviction counters."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
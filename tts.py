@@ -0,0 +1,184 @@
+import io
+import os
+import re
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from gtts import gTTS  # For text-to-speech conversion
+from streamlit import config, runtime
+from ttl_cache import TTLCache
+from blob_store import BlobStore
+
+# --- Text-to-Speech Settings ---
+TTS_LANG = "en"
+TTS_FIRST_CHUNK_CHARS = 120        # The first clip is kept short so playback can start sooner
+TTS_CHUNK_CHARS = 400              # Later clips group sentences up to this length
+TTS_WORKERS = 6                    # gTTS requests are network-bound
+TTS_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".chatbot_tts_index.db")  # Clip text -> audio file
+
+# --- Audio Store Settings ---
+AUDIO_STORE_DIR = os.path.join(os.path.expanduser("~"), ".chatbot_tts_audio")
+AUDIO_STORE_MAX_BYTES = 200 * 1024 * 1024   # Least recently used clips are deleted beyond this
+# Clips are served by Streamlit's own media endpoint (same port as the app) unless this is
+# set. The separate audio server lets browsers cache clips across sessions, but only works
+# where the browser can reach AUDIO_SERVER_PORT (not behind the devcontainer/Codespaces 8501
+# forward, nor from an HTTPS page).
+AUDIO_SERVER_ENABLED = False
+AUDIO_SERVER_HOST = "127.0.0.1"
+AUDIO_SERVER_PORT = 0                       # 0 picks a free port
+AUDIO_PUBLIC_URL = None                     # Set when the browser reaches the server under another address
+
+# --- Process-wide Synthesized Audio Store (shared by Astra and Vertex) ---
+# Clips live on disk; the cache only maps clip text to a file name.
+audio_store = BlobStore(AUDIO_STORE_DIR, max_bytes=AUDIO_STORE_MAX_BYTES)
+tts_cache = TTLCache(max_entries=4096, db_path=TTS_INDEX_PATH)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+SENTENCE_BREAK = re.compile(r"(?<=[.!?;:])\s+|\n+")
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=TTS_WORKERS, thread_name_prefix="tts")
+        return _pool
+
+# --- Chunking ---
+def chunk_text(text):
+    """Groups sentences into clips: a short first one, then up to TTS_CHUNK_CHARS each."""
+    chunks, current = [], ""
+    for sentence in SENTENCE_BREAK.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        limit = TTS_FIRST_CHUNK_CHARS if not chunks else TTS_CHUNK_CHARS
+        if current and len(current) + 1 + len(sentence) > limit:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+# --- Synthesis ---
+def tts_key(chunk, lang):
+    return hashlib.sha256(f"{lang}\0{' '.join(chunk.split())}".encode("utf-8")).hexdigest()
+
+def synthesize_chunk(chunk, lang=TTS_LANG):
+    """Returns the audio store name of one clip's MP3, reusing earlier audio for the same text."""
+    key = tts_key(chunk, lang)
+    name = tts_cache.get(key)
+    if name is not None and audio_store.exists(name):
+        audio_store.touch(name)
+        return name
+    buffer = io.BytesIO()
+    gTTS(chunk, lang=lang).write_to_fp(buffer)
+    name = audio_store.put(buffer.getvalue(), ".mp3")
+    tts_cache.set(key, name)
+    return name
+
+def audio_url(name):
+    """
+    Returns the URL the player loads a stored clip from. By default the clip is registered
+    with Streamlit's media file manager for the current session, which serves it from the
+    app's own port; call this on every script run that shows the clip, as Streamlit drops
+    media no longer referenced by the session.
+    """
+    if AUDIO_SERVER_ENABLED:
+        base_url = audio_store.serve(AUDIO_SERVER_HOST, AUDIO_SERVER_PORT, AUDIO_PUBLIC_URL)
+        return f"{base_url}/{name}"
+    url = runtime.get_instance().media_file_mgr.add(audio_store.path(name), "audio/mpeg", f"tts.{name}")
+    base_path = config.get_option("server.baseUrlPath").strip("/")
+    return f"/{base_path}{url}" if base_path else url
+
+def iter_clips(text, lang=TTS_LANG):
+    """
+    Synthesizes every clip of text concurrently and yields their audio store names in
+    reading order, each as soon as it (and every clip before it) is ready, so playback can
+    start early.
+    """
+    futures = [get_pool().submit(synthesize_chunk, chunk, lang) for chunk in chunk_text(text)]
+    try:
+        for future in futures:
+            yield future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+# --- Playback ---
+def play_audio_with_delay(audio_urls, playlist_id, delay=10000):
+    """
+    Creates an HTML audio element that plays the clips at audio_urls in order, starting after
+    a delay. The playback position is kept on the parent page under playlist_id, so when the
+    player is re-rendered with more clips (or on a rerun) it carries on instead of starting
+    over. Also listens for key events: "p" to play, "s" to stop.
+    """
+    sources = ", ".join(f'"{url}"' for url in audio_urls)
+    audio_html = f"""
+    <audio id="tts-audio" controls></audio>
+    <script>
+    // Clips play back to back; the first one is short so it starts quickly
+    var clips = [{sources}];
+    var playlistId = "{playlist_id}";
+    var store = {{}};
+    try {{
+       store = window.parent.ttsPlayback = window.parent.ttsPlayback || {{}};
+    }} catch(e) {{}}
+    var saved = store[playlistId];
+    var current = 0;
+    var audio = document.getElementById("tts-audio");
+
+    function load(index, time) {{
+       current = index;
+       audio.src = clips[index];
+       if(time) {{
+          audio.currentTime = time;
+       }}
+    }}
+    function save(ended) {{
+       store[playlistId] = {{index: current, time: audio.currentTime, playing: !audio.paused, ended: ended}};
+    }}
+    audio.addEventListener('timeupdate', function() {{ save(false); }});
+    audio.addEventListener('pause', function() {{
+       if(!audio.ended) save(false);
+    }});
+    audio.addEventListener('ended', function() {{
+       if(current + 1 < clips.length) {{
+          load(current + 1, 0);
+          audio.play();
+       }} else {{
+          // Out of clips for now; a re-render with more clips picks up from the next one
+          save(true);
+       }}
+    }});
+
+    if(clips.length) {{
+       if(!saved) {{
+          // New playlist: auto-play after delay
+          load(0, 0);
+          setTimeout(function() {{ audio.play(); }}, {delay});
+       }} else if(saved.ended && saved.index + 1 < clips.length) {{
+          load(saved.index + 1, 0);
+          audio.play();
+       }} else if(saved.ended) {{
+          load(saved.index, 0);
+       }} else {{
+          load(saved.index, saved.time);
+          if(saved.playing) audio.play();
+       }}
+    }}
+
+    // Listen for key events: p to play, s to pause
+    document.addEventListener('keydown', function(e) {{
+      if(e.key === 'p' || e.key === 'P') {{
+         audio.play();
+      }} else if(e.key === 's' || e.key === 'S') {{
+         audio.pause();
+      }}
+    }});
+    </script>
+    """
+    return audio_html
@@ -1,7 +1,10 @@
 import os
 import time
+import uuid
 import datetime
-import requests
+from quotes import parse_symbols, refresh_watchlist, watchlist_frame  # Concurrent, rate-limited stock quotes
+from web_search import web_search, search_cache, search_totals  # Concurrent multi-provider search with a result cache
+from http_client import fetch_json, format_http_stats  # Pooled, retrying, cached HTTP for web APIs
 import streamlit as st
 import google.generativeai as genai
 import nltk
@@ -12,18 +15,18 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from plyer import notification  # Desktop notification library
 import speech_recognition as sr
-from pydub import AudioSegment
-import io
-import base64
-from gtts import gTTS  # For text-to-speech conversion
+from tts import iter_clips, audio_url, play_audio_with_delay, audio_store  # Sentence-chunked, concurrent, cached gTTS
 import streamlit.components.v1 as components
-import pytesseract  # Tesseract OCR library
-from PIL import Image  # For image processing
-from urllib.parse import urlparse, parse_qs
-from youtube_transcript_api import YouTubeTranscriptApi  # For YouTube transcript extraction
+from response_cache import response_cache, get_cached_response, cache_response
+from speech import (  # Chunked transcription with online or offline recognizers
+    SPEECH_BACKENDS, SPEECH_BACKEND_LOCAL, transcribe, get_recognizer, local_backend_error, warm_local_backend,
+)
+from youtube import extract_youtube_id, fetch_transcript  # Cached YouTube transcripts
+from ocr import ocr_file  # Preprocessed, concurrent, hash-cached Tesseract OCR
 
 # --- Configure Tesseract Path (update the path as needed) ---
-# Uncomment and update the following line if you are on Windows:
+# Uncomment and update the following lines if you are on Windows:
+# import pytesseract
 # pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
 # --- API Keys (Update these with your credentials) ---
@@ -34,12 +37,19 @@ SMTP_PORT = 465                               # For Gmail SMTP SSL
 
 # Gemini API
 genai.configure(api_key="")
+GEMINI_MODEL = "gemini-2.0-flash"
 
 # Additional API Keys
 OPENWEATHER_API_KEY = ""  # Replace with your OpenWeatherMap API key
 NEWS_API_KEY = ""          # Replace with your NewsAPI key
 FINHUB_API_KEY = ""  # Replace with your Finhub API key
 
+# --- Chat Context Settings ---
+CONTEXT_RECENT_MESSAGES = 8    # Most recent user/bot messages always kept verbatim (budget permitting)
+CONTEXT_TOKEN_BUDGET = 3000    # Hard cap on the estimated size of the chat prompt
+SUMMARY_TOKEN_BUDGET = 600     # Cap on the running summary of older messages
+SUMMARY_FOLD_BATCH = 4         # Older messages are folded into the summary in batches of this size
+
 # --- Download necessary NLTK packages ---
 nltk.download('punkt')
 nltk.download('wordnet')
@@ -89,17 +99,68 @@ def detect_intent(text):
     return "chat"
 
 # --- Gemini API Response Function ---
+def format_api_error(e):
+    error_message = str(e)
+    if "rate limit" in error_message.lower() or (hasattr(e, "response") and getattr(e, "response").status_code == 429):
+        return "The Gemini API rate limit has been reached. Please try again later."
+    else:
+        return f"Error generating response: {error_message}"
+
+def generate_text(prompt):
+    """Returns the (cached) Gemini response for prompt; raises on API errors."""
+    cached = get_cached_response(GEMINI_MODEL, prompt)
+    if cached is not None:
+        return cached
+    model = genai.GenerativeModel(GEMINI_MODEL)
+    response = model.generate_content(prompt)
+    text = response.text.strip()
+    cache_response(GEMINI_MODEL, prompt, text)
+    return text
+
 def generate_api_response(prompt):
     try:
-        model = genai.GenerativeModel("gemini-2.0-flash")
-        response = model.generate_content(prompt)
-        return response.text.strip()
+        return generate_text(prompt)
+    except Exception as e:
+        return format_api_error(e)
+
+def stream_chunk_text(chunk):
+    # chunk.text raises on chunks without a text part (safety-blocked or finish-only chunks)
+    if not chunk.candidates or not chunk.candidates[0].content.parts:
+        return ""
+    return "".join(getattr(part, "text", "") for part in chunk.candidates[0].content.parts)
+
+def generate_api_response_stream(prompt):
+    # Yields the response in chunks as Gemini produces them; raises on API errors
+    cached = get_cached_response(GEMINI_MODEL, prompt)
+    if cached is not None:
+        yield cached
+        return
+    model = genai.GenerativeModel(GEMINI_MODEL)
+    chunks = []
+    for chunk in model.generate_content(prompt, stream=True):
+        text = stream_chunk_text(chunk)
+        if text:
+            chunks.append(text)
+            yield text
+    # Only reached when the stream finished normally; errors and abandoned streams raise first
+    cache_response(GEMINI_MODEL, prompt, "".join(chunks).strip())
+
+def render_stream(chunks, placeholder):
+    # A stream that fails part way keeps its partial answer; the error is shown separately
+    text = ""
+    try:
+        for chunk in chunks:
+            text += chunk
+            placeholder.markdown(f'<div class="message message-vertex"><strong>Vertex:</strong> {text}▌</div>', unsafe_allow_html=True)
     except Exception as e:
-        error_message = str(e)
-        if "rate limit" in error_message.lower() or (hasattr(e, "response") and getattr(e, "response").status_code == 429):
-            return "The Gemini API rate limit has been reached. Please try again later."
+        if not text.strip():
+            text = format_api_error(e)
         else:
-            return f"Error generating response: {error_message}"
+            st.session_state.stream_error = f"The response was cut short: {format_api_error(e)}"
+    if not text.strip():
+        text = "No response was generated (it may have been blocked by the safety filters)."
+    placeholder.markdown(f'<div class="message message-vertex"><strong>Vertex:</strong> {text}</div>', unsafe_allow_html=True)
+    return text.strip()
 
 # --- Extract Reminder Details using Gemini API ---
 def extract_reminder_details_with_gemini(message):
@@ -234,64 +295,73 @@ def schedule_recurring_notification(reminder_time, task, recurrence, user_email)
     threading.Timer(delay, notify_and_reschedule).start()
 
 # --- Text-to-Speech Functionality ---
-def play_audio_with_delay(audio_bytes, delay=10000):
-    b64_audio = base64.b64encode(audio_bytes.read()).decode()
-    audio_html = f"""
-    <audio id="tts-audio" controls src="data:audio/mp3;base64,{b64_audio}"></audio>
-    <script>
-    setTimeout(function() {{
-       var audio = document.getElementById("tts-audio");
-       if(audio) {{
-          audio.play();
-       }}
-    }}, {delay});
-    document.addEventListener('keydown', function(e) {{
-      var audio = document.getElementById("tts-audio");
-      if(!audio) return;
-      if(e.key === 'p' || e.key === 'P') {{
-         audio.play();
-      }} else if(e.key === 's' || e.key === 'S') {{
-         audio.pause();
-      }}
-    }});
-    </script>
+def render_read_aloud():
     """
-    return audio_html
+    Shows the read-aloud player. For a new answer the clips are synthesized here: the player
+    starts on the first clip and is re-rendered (resuming in place) as later ones arrive.
+    Session state keeps only the clip names; their URLs are re-issued on every run.
+    """
+    slot = st.empty()
+    text = st.session_state.get("tts_text")
+    if text:
+        clips, urls = [], []
+        try:
+            for name in iter_clips(text):
+                clips.append(name)
+                urls.append(audio_url(name))
+                with slot.container():
+                    components.html(play_audio_with_delay(urls, st.session_state.tts_playlist, delay=2000), height=200)
+        except Exception as e:
+            st.error(f"Error in text-to-speech conversion: {e}")
+        st.session_state.tts_audio = clips
+        st.session_state.tts_text = None
+    elif st.session_state.tts_audio:
+        if not all(audio_store.exists(name) for name in st.session_state.tts_audio):
+            # A clip was evicted from the audio store since it was synthesized
+            st.session_state.tts_audio = []
+            return
+        urls = [audio_url(name) for name in st.session_state.tts_audio]
+        with slot.container():
+            components.html(play_audio_with_delay(urls, st.session_state.tts_playlist, delay=2000), height=200)
 
 # --- Voice Command Functions ---
 def transcribe_audio(audio_file):
-    recognizer = sr.Recognizer()
-    if not audio_file.name.lower().endswith('.wav'):
-        try:
-            audio = AudioSegment.from_file(audio_file)
-            audio_file_wav = io.BytesIO()
-            audio.export(audio_file_wav, format="wav")
-            audio_file_wav.seek(0)
-            audio_file = audio_file_wav
-        except Exception as e:
-            st.error(f"Error converting audio file: {e}")
-            return None
+    """
+    Transcribes an uploaded recording in silence-split chunks recognized concurrently,
+    showing the transcript as it fills in.
+    """
+    progress = st.progress(0.0, text="Decoding audio...")
+    preview = st.empty()
+
+    def show_progress(done, total, text, failed):
+        note = f" ({failed} failed)" if failed else ""
+        progress.progress(done / total, text=f"Transcribed {done} of {total} chunks{note}")
+        preview.text(text)
+
     try:
-        with sr.AudioFile(audio_file) as source:
-            audio_data = recognizer.record(source)
-            return recognizer.recognize_google(audio_data)
+        recognize = get_recognizer(st.session_state.get("speech_backend"))
+        text, failed = transcribe(audio_file, recognize=recognize, on_progress=show_progress)
+        if failed:
+            st.warning(f"{failed} part(s) of the recording could not be transcribed; they are marked [inaudible] in the text.")
+        return text
     except Exception as e:
         st.error(f"Error transcribing audio: {e}")
         return None
 
 def transcribe_microphone():
     r = sr.Recognizer()
+    recognize = get_recognizer(st.session_state.get("speech_backend"))
     try:
         with sr.Microphone() as source:
             with st.spinner("Listening..."):
                 audio = r.listen(source, timeout=5)
         try:
-            text = r.recognize_google(audio)
+            text = recognize(audio)
+            if not text:
+                st.error("Could not understand audio")
+                return None
             return text
-        except sr.UnknownValueError:
-            st.error("Could not understand audio")
-            return None
-        except sr.RequestError as e:
+        except Exception as e:
             st.error(f"Error: {e}")
             return None
     except OSError:
@@ -301,9 +371,8 @@ def transcribe_microphone():
 # --- OCR Functionality using Tesseract ---
 def perform_ocr(image_file, lang="eng"):
     try:
-        image = Image.open(image_file)
-        extracted_text = pytesseract.image_to_string(image, lang=lang)
-        return extracted_text.strip()
+        # Pages are preprocessed, OCR'd in parallel and cached by image hash
+        return ocr_file(image_file, lang=lang)
     except Exception as e:
         st.error(f"Error during OCR processing: {e}")
         return None
@@ -312,54 +381,28 @@ def perform_ocr(image_file, lang="eng"):
 def get_joke():
     url = "https://icanhazdadjoke.com/"
     headers = {"Accept": "application/json"}
-    response = requests.get(url, headers=headers)
-    if response.status_code == 200:
-        return response.json().get("joke", "I couldn't find a joke right now.")
+    status, data = fetch_json("joke", url, headers=headers)
+    if status == 200 and data is not None:
+        return data.get("joke", "I couldn't find a joke right now.")
+    elif status == 429:
+        return "The joke service is rate limited right now. Please try again in a minute."
     else:
         return "I'm sorry, I couldn't fetch a joke right now."
 
 # --- Smart Web Search Function ---
 def smart_web_search(query):
-    endpoint = "https://api.duckduckgo.com/"
-    params = {
-        "q": query,
-        "format": "json",
-        "no_html": 1,
-        "skip_disambig": 1
-    }
-    response = requests.get(endpoint, params=params)
-    results = []
-    if response.status_code == 200:
-        data = response.json()
-        if data.get("AbstractText"):
-            results.append({
-                "title": data.get("Heading", "Result"),
-                "url": data.get("AbstractURL", ""),
-                "snippet": data.get("AbstractText", "")
-            })
-        elif data.get("RelatedTopics"):
-            for topic in data.get("RelatedTopics", []):
-                if isinstance(topic, dict) and topic.get("Text") and topic.get("FirstURL"):
-                    results.append({
-                        "title": topic.get("Text"),
-                        "url": topic.get("FirstURL"),
-                        "snippet": topic.get("Text")
-                    })
-    return results
+    try:
+        return web_search(query)
+    except Exception:
+        return []
 
 # --- YouTube Transcript Extraction Function ---
 def extract_youtube_transcript(video_url):
     try:
-        parsed_url = urlparse(video_url)
-        query_params = parse_qs(parsed_url.query)
-        video_id = None
-        if "v" in query_params:
-            video_id = query_params["v"][0]
-        else:
-            video_id = parsed_url.path.split("/")[-1]
+        video_id = extract_youtube_id(video_url)
         if not video_id:
             return "Could not extract video ID from URL."
-        transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
+        transcript_list = fetch_transcript(video_id)
         transcript_text = ""
         for segment in transcript_list:
             start = str(datetime.timedelta(seconds=int(segment["start"])))
@@ -370,14 +413,15 @@ def extract_youtube_transcript(video_url):
 
 # --- Weather API Function ---
 def get_weather(location):
-    url = f"http://api.openweathermap.org/data/2.5/weather?q={location}&appid={OPENWEATHER_API_KEY}&units=metric"
-    response = requests.get(url)
-    if response.status_code == 200:
-        data = response.json()
+    params = {"q": location, "appid": OPENWEATHER_API_KEY, "units": "metric"}
+    status, data = fetch_json("weather", "http://api.openweathermap.org/data/2.5/weather", params=params)
+    if status == 200:
         weather_desc = data["weather"][0]["description"].capitalize()
         temp = data["main"]["temp"]
         humidity = data["main"]["humidity"]
         return f"Weather in {location}: {weather_desc} with a temperature of {temp}°C and humidity of {humidity}%."
+    elif status == 429:
+        return "Weather service is rate limited right now. Please try again in a minute."
     else:
         return "Could not retrieve weather data. Please check the location or API key."
 
@@ -390,9 +434,8 @@ def get_news(query=None):
     }
     if query:
         params["q"] = query
-    response = requests.get(base_url, params=params)
-    if response.status_code == 200:
-        data = response.json()
+    status, data = fetch_json("news", base_url, params=params)
+    if status == 200:
         articles = data.get("articles", [])
         if articles:
             news_str = ""
@@ -403,37 +446,108 @@ def get_news(query=None):
             return news_str
         else:
             return "No news articles found."
+    elif status == 429:
+        return "News service is rate limited right now. Please try again in a minute."
     else:
         return "Could not retrieve news data. Please check your API key and parameters."
 
-# --- Finhub Stock API Function ---
-def get_stock_info(symbol):
-    url = f"https://finnhub.io/api/v1/quote?symbol={symbol}&token={FINHUB_API_KEY}"
-    response = requests.get(url)
-    if response.status_code == 200:
-        data = response.json()
-        current_price = data.get("c")
-        high_price = data.get("h")
-        low_price = data.get("l")
-        open_price = data.get("o")
-        previous_close = data.get("pc")
-        if current_price is not None:
-            return (f"Stock: {symbol.upper()}\n"
-                    f"Current Price: {current_price}\n"
-                    f"High: {high_price}\n"
-                    f"Low: {low_price}\n"
-                    f"Open: {open_price}\n"
-                    f"Previous Close: {previous_close}")
-        else:
-            return "Could not retrieve stock data. Please check the symbol."
-    else:
-        return "Error retrieving stock data."
-
 # --- System Prompt for Vertex Bot ---
 def get_system_prompt(user_name):
     return (f"You are Vertex, an everyday bot chatting with {user_name}. Provide helpful advice on productivity and time management. "
             "Do not include your name in your responses.")
 
+# --- Rolling Conversation Context ---
+def estimate_tokens(text):
+    # Rough estimate (~4 characters per token); avoids a tokenizer dependency
+    return len(text) // 4 + 1
+
+def truncate_to_tokens(text, max_tokens):
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rstrip() + " ..."
+
+def keep_last_tokens(text, max_tokens):
+    # Like truncate_to_tokens, but drops the oldest text instead of the newest
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    return "... " + text[-max_chars:].lstrip()
+
+def format_dialogue_line(speaker, msg):
+    return f"User: {msg}\n" if speaker == "user" else f"Bot: {msg}\n"
+
+def fold_into_summary(summary, messages):
+    transcript = "".join(format_dialogue_line(speaker, msg) for speaker, msg in messages)
+    prompt = (
+        "Update the running summary of a conversation with the new messages below. "
+        "Keep facts, names, decisions and open requests; drop small talk. "
+        f"Answer with the updated summary only, in at most {SUMMARY_TOKEN_BUDGET * 3 // 4} words.\n\n"
+        f"Current summary:\n{summary or '(empty)'}\n\n"
+        f"New messages:\n{truncate_to_tokens(transcript, CONTEXT_TOKEN_BUDGET)}\n\n"
+        "Updated summary:"
+    )
+    try:
+        new_summary = generate_text(prompt)
+    except Exception:
+        # Keep the conversation moving: append the transcript and keep its newest part
+        return keep_last_tokens(f"{summary}\n{transcript}".strip(), SUMMARY_TOKEN_BUDGET)
+    return truncate_to_tokens(new_summary, SUMMARY_TOKEN_BUDGET)
+
+def build_chat_prompt(system_prompt):
+    """
+    Builds the chat prompt from the system prompt, a running summary of older messages
+    and the most recent messages verbatim, keeping the estimated size under
+    CONTEXT_TOKEN_BUDGET however long the session runs.
+    """
+    dialogue = [(speaker, msg) for speaker, msg in st.session_state.messages if speaker in ("user", "bot")]
+    summarized = st.session_state.get("context_summarized", 0)
+    summary = st.session_state.get("context_summary", "")
+
+    older = dialogue[summarized:max(summarized, len(dialogue) - CONTEXT_RECENT_MESSAGES)]
+    if len(older) >= SUMMARY_FOLD_BATCH:
+        summary = fold_into_summary(summary, older)
+        summarized += len(older)
+        st.session_state.context_summary = summary
+        st.session_state.context_summarized = summarized
+
+    def summary_header(summary):
+        return f"Summary of the earlier conversation:\n{summary}\n\n" if summary else ""
+
+    remaining = CONTEXT_TOKEN_BUDGET - estimate_tokens(system_prompt + "\n" + summary_header(summary))
+    start = first_fitting_message(dialogue, summarized, remaining)
+    if start > summarized:
+        # Messages that don't fit verbatim are folded into the summary rather than dropped;
+        # room is kept for the summary to grow to its full budget
+        reserved = estimate_tokens(system_prompt + "\n" + summary_header("x" * SUMMARY_TOKEN_BUDGET * 4)) + 2
+        start = first_fitting_message(dialogue, summarized, CONTEXT_TOKEN_BUDGET - reserved)
+        summary = fold_into_summary(summary, dialogue[summarized:start])
+        summarized = start
+        st.session_state.context_summary = summary
+        st.session_state.context_summarized = summarized
+
+    header = system_prompt + "\n" + summary_header(summary)
+    remaining = CONTEXT_TOKEN_BUDGET - estimate_tokens(header)
+    lines = [format_dialogue_line(speaker, msg) for speaker, msg in dialogue[summarized:]]
+    if len(lines) == 1 and estimate_tokens(lines[0]) > remaining:
+        # A single message over the whole budget is the only one clipped
+        lines[0] = truncate_to_tokens(lines[0], max(remaining, 0))
+    return header + "".join(lines)
+
+def first_fitting_message(dialogue, start, budget):
+    """
+    Returns the index of the oldest message from which dialogue[index:] fits in budget
+    tokens, counting newest-first. The newest message is always kept.
+    """
+    index = len(dialogue)
+    for speaker, msg in reversed(dialogue[start:]):
+        cost = estimate_tokens(format_dialogue_line(speaker, msg))
+        if cost > budget and index < len(dialogue):
+            break
+        budget -= cost
+        index -= 1
+    return index
+
 # --- Chat History Analysis Function ---
 def analyze_chat_history():
     if 'messages' not in st.session_state or not st.session_state.messages:
@@ -536,9 +650,26 @@ def main():
         mode = st.radio("Select Mode", ["Chat", "YouTube Transcript Extraction"], key="mode_selection")
         if st.button("Clear Conversation"):
             st.session_state.messages = []
+            st.session_state.context_summary = ""
+            st.session_state.context_summarized = 0
             safe_rerun()
 
         st.checkbox("Read bot responses aloud", key="read_aloud", value=False)
+        st.checkbox("Stream responses", key="stream_responses", value=True)
+        st.radio("Speech recognition", SPEECH_BACKENDS, key="speech_backend", horizontal=True)
+        if st.session_state.speech_backend == SPEECH_BACKEND_LOCAL:
+            backend_error = local_backend_error()
+            if backend_error:
+                st.warning(backend_error)
+            else:
+                warm_local_backend()
+        cache_stats = response_cache.stats()
+        st.caption(f"Response cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+        st.caption(format_http_stats())
+        st.caption(
+            f"Web search: {search_totals['searches']} searches, {search_cache.stats()['hits']} cached, "
+            f"{search_totals['timeouts']} provider timeouts"
+        )
         
         # --- Audio File Uploader for Voice Commands ---
         uploaded_audio = st.file_uploader("Upload Audio File", type=["wav", "mp3", "ogg", "m4a"])
@@ -550,7 +681,7 @@ def main():
         
         # --- OCR Image Uploader with Language Selection ---
         ocr_language = st.selectbox("Select OCR Language", options=["eng", "spa", "fra"], index=0)
-        uploaded_image = st.file_uploader("Upload Image for OCR", type=["png", "jpg", "jpeg", "tiff"])
+        uploaded_image = st.file_uploader("Upload Image for OCR", type=["png", "jpg", "jpeg", "tiff", "tif"])
         if uploaded_image:
             ocr_text = perform_ocr(uploaded_image, lang=ocr_language)
             if ocr_text:
@@ -597,13 +728,21 @@ def main():
 
         # --- Stocks Section ---
         st.subheader("Stocks")
-        stock_symbol = st.text_input("Enter stock symbol", key="stock_symbol")
+        symbols = parse_symbols(st.text_input("Enter stock symbols (comma separated)", key="stock_symbol"))
+        if "watchlist" not in st.session_state:
+            st.session_state.watchlist = {}
+        table = st.empty()
         if st.button("Get Stock Info"):
-            if stock_symbol.strip():
-                stock_info = get_stock_info(stock_symbol.strip())
-                st.info(stock_info)
+            if symbols:
+                def show_rows(changed):
+                    table.dataframe(watchlist_frame(st.session_state.watchlist, symbols, changed), hide_index=True)
+
+                show_rows(set())
+                refresh_watchlist(st.session_state.watchlist, symbols, FINHUB_API_KEY, on_change=show_rows)
             else:
                 st.info("Please enter a stock symbol.")
+        elif st.session_state.watchlist:
+            table.dataframe(watchlist_frame(st.session_state.watchlist, symbols), hide_index=True)
 
         # --- Chat History Analysis Section ---
         st.subheader("Chat History Analysis")
@@ -621,7 +760,10 @@ def main():
     if 'voice_input' not in st.session_state:
         st.session_state.voice_input = ""
     if 'tts_audio' not in st.session_state:
-        st.session_state.tts_audio = ""
+        st.session_state.tts_audio = []
+    if 'context_summary' not in st.session_state:
+        st.session_state.context_summary = ""  # Running summary of messages folded out of the prompt
+        st.session_state.context_summarized = 0
 
     # -------------------- Ask for the User's Name --------------------
     if st.session_state.user_name is None:
@@ -675,10 +817,12 @@ def main():
                 st.markdown(f'<div class="message message-vertex"><strong>Vertex:</strong> {message}</div>', unsafe_allow_html=True)
             elif speaker == "user":
                 st.markdown(f'<div class="message message-user"><strong>You:</strong> {message}</div>', unsafe_allow_html=True)
+        if st.session_state.get("stream_error"):
+            st.error(st.session_state.pop("stream_error"))
+        stream_placeholder = st.empty()
         st.markdown('</div>', unsafe_allow_html=True)
 
-    if st.session_state.tts_audio:
-        components.html(st.session_state.tts_audio, height=200)
+    render_read_aloud()
 
     col1, col2 = st.columns([5,1])
     with col1:
@@ -741,29 +885,23 @@ def main():
             else:
                 response = "Please provide a query after 'search'."
         else:
-            prompt = ""
-            for speaker, msg in st.session_state.messages:
-                if speaker == "user":
-                    prompt += f"User: {msg}\n"
-                elif speaker == "bot":
-                    prompt += f"Bot: {msg}\n"
             system_prompt = get_system_prompt(st.session_state.user_name)
-            full_prompt = system_prompt + "\n" + prompt
-            response = generate_api_response(full_prompt)
+            full_prompt = build_chat_prompt(system_prompt)
+            if st.session_state.get("stream_responses", True):
+                with stream_placeholder.container():
+                    st.markdown(f'<div class="message message-user"><strong>You:</strong> {user_message.strip()}</div>', unsafe_allow_html=True)
+                    response = render_stream(generate_api_response_stream(full_prompt), st.empty())
+            else:
+                response = generate_api_response(full_prompt)
 
         st.session_state.messages.append(("bot", response))
         st.session_state.voice_input = ""
         
         if st.session_state.get("read_aloud", False):
-            try:
-                tts = gTTS(response)
-                audio_bytes = io.BytesIO()
-                tts.write_to_fp(audio_bytes)
-                audio_bytes.seek(0)
-                audio_html = play_audio_with_delay(audio_bytes, delay=2000)
-                st.session_state.tts_audio = audio_html
-            except Exception as e:
-                st.error(f"Error in text-to-speech conversion: {e}")
+            # Synthesized by render_read_aloud after the rerun, so playback starts with the first clip
+            st.session_state.tts_text = response
+            st.session_state.tts_audio = []
+            st.session_state.tts_playlist = uuid.uuid4().hex
         safe_rerun()
 
     st.markdown("</div>", unsafe_allow_html=True)
@@ -0,0 +1,192 @@
+import os
+import re
+import json
+import threading
+from html import unescape
+from urllib.parse import urlsplit, urlunsplit
+from concurrent.futures import ThreadPoolExecutor, wait
+from http_client import fetch_json
+from ttl_cache import TTLCache
+
+# --- Web Search Settings ---
+SEARCH_DEADLINE = 2.5          # Seconds to wait for providers before returning what has arrived
+# Providers give up at the deadline too, without retries, so late requests don't pile up in the pool
+SEARCH_HTTP_TIMEOUT = (min(3.05, SEARCH_DEADLINE), SEARCH_DEADLINE)  # (connect, read) seconds
+SEARCH_MAX_RESULTS = 10
+SEARCH_PROVIDER_RESULTS = 8    # Results asked of each provider
+SEARCH_CACHE_TTL = 15 * 60     # Seconds a complete result set is reused
+SEARCH_WORKERS = 8
+SEARCH_INDEX_PATH = os.environ.get("WEB_SEARCH_INDEX")  # Optional offline index (JSON list of {"title", "url", "snippet"})
+SEARCH_USER_AGENT = "AstraVertexChatbot/1.0 (web search)"
+
+# --- Process-wide Result Cache and Provider Pool (shared by Astra and Vertex) ---
+search_cache = TTLCache(max_entries=256, ttl=SEARCH_CACHE_TTL)
+search_totals = {"searches": 0, "timeouts": 0, "errors": 0}
+_totals_lock = threading.Lock()
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    # Kept alive across searches so a provider that misses the deadline never blocks the caller
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="search")
+        return _pool
+
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+def normalize_url(url):
+    """Canonical form used to spot the same page from different providers."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(("https", host, path, parts.query, ""))
+
+def make_result(title, url, snippet, source):
+    return {"title": title.strip(), "url": url.strip(), "snippet": snippet.strip(), "source": source}
+
+# --- Providers (each takes a query and returns a list of results) ---
+def search_instant_answer(query):
+    """DuckDuckGo Instant Answer API: the abstract, direct results and related topics."""
+    params = {"q": query, "format": "json", "no_html": 1, "skip_disambig": 1}
+    status, data = fetch_json("duckduckgo", "https://api.duckduckgo.com/", params=params,
+                              retries=False, timeout=SEARCH_HTTP_TIMEOUT)
+    if status == 429:
+        raise RuntimeError("DuckDuckGo rate limited the search")
+    if status != 200 or data is None:
+        raise RuntimeError(f"DuckDuckGo returned HTTP {status}")
+    results = []
+    if data.get("AbstractText") and data.get("AbstractURL"):
+        results.append(make_result(data.get("Heading") or "Result", data["AbstractURL"], data["AbstractText"], "duckduckgo"))
+    topics = list(data.get("Results", [])) + list(data.get("RelatedTopics", []))
+    while topics and len(results) < SEARCH_PROVIDER_RESULTS:
+        topic = topics.pop(0)
+        if "Topics" in topic:
+            # Grouped topics ("See also", categories) nest one level down
+            topics.extend(topic["Topics"])
+        elif topic.get("Text") and topic.get("FirstURL"):
+            title = topic["Text"].split(" - ")[0]
+            results.append(make_result(title, topic["FirstURL"], topic["Text"], "duckduckgo"))
+    return results
+
+def search_wikipedia(query):
+    """Wikipedia full-text search; fills in when DuckDuckGo has no instant answer."""
+    params = {
+        "action": "query",
+        "list": "search",
+        "srsearch": query,
+        "srlimit": SEARCH_PROVIDER_RESULTS,
+        "format": "json",
+    }
+    headers = {"User-Agent": SEARCH_USER_AGENT}
+    status, data = fetch_json("wikipedia", "https://en.wikipedia.org/w/api.php", params=params, headers=headers,
+                              retries=False, timeout=SEARCH_HTTP_TIMEOUT)
+    if status == 429:
+        raise RuntimeError("Wikipedia rate limited the search")
+    if status != 200 or data is None:
+        raise RuntimeError(f"Wikipedia returned HTTP {status}")
+    results = []
+    for hit in data.get("query", {}).get("search", []):
+        title = hit.get("title", "")
+        snippet = unescape(re.sub(r"<[^>]+>", "", hit.get("snippet", "")))
+        url = "https://en.wikipedia.org/wiki/" + title.replace(" ", "_")
+        results.append(make_result(title, url, snippet, "wikipedia"))
+    return results
+
+class LocalIndex:
+    """
+    Offline provider over a JSON list of {"title", "url", "snippet"} documents, ranked by
+    how many query words they contain. Used without network access and in tests.
+    """
+
+    def __init__(self, documents=None, path=None):
+        self.path = path
+        self._documents = documents
+        self._lock = threading.Lock()
+
+    def documents(self):
+        with self._lock:
+            if self._documents is None:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._documents = json.load(f)
+            return self._documents
+
+    def __call__(self, query):
+        words = set(re.findall(r"\w+", query.lower()))
+        scored = []
+        for position, doc in enumerate(self.documents()):
+            text = f"{doc.get('title', '')} {doc.get('snippet', '')}".lower()
+            score = len(words & set(re.findall(r"\w+", text)))
+            if score:
+                scored.append((-score, position, doc))
+        scored.sort(key=lambda item: item[:2])
+        return [
+            make_result(doc.get("title", ""), doc.get("url", ""), doc.get("snippet", ""), "local")
+            for _, _, doc in scored[:SEARCH_PROVIDER_RESULTS]
+        ]
+
+# In priority order: when providers return the same page, the earlier one's entry is kept
+SEARCH_PROVIDERS = {
+    "duckduckgo": search_instant_answer,
+    "wikipedia": search_wikipedia,
+}
+if SEARCH_INDEX_PATH:
+    SEARCH_PROVIDERS["local"] = LocalIndex(path=SEARCH_INDEX_PATH)
+
+# --- Search ---
+def merge_results(result_lists, limit=SEARCH_MAX_RESULTS):
+    """Interleaves the providers' results (best first) and drops repeated URLs."""
+    merged, seen = [], {}
+    for rank in range(max((len(results) for results in result_lists), default=0)):
+        for results in result_lists:
+            if rank >= len(results) or not results[rank]["url"]:
+                continue
+            result = results[rank]
+            key = normalize_url(result["url"])
+            if key in seen:
+                # Same page from another provider: keep the first entry, borrow a missing snippet
+                if not seen[key]["snippet"]:
+                    seen[key]["snippet"] = result["snippet"]
+                continue
+            seen[key] = dict(result)
+            merged.append(seen[key])
+    return merged[:limit]
+
+def web_search(query, deadline=SEARCH_DEADLINE, providers=None):
+    """
+    Queries every provider concurrently and returns the merged, de-duplicated results
+    ({"title", "url", "snippet", "source"}) that arrived within deadline seconds. Failed
+    or late providers are skipped; only complete, non-empty result sets are cached.
+    """
+    providers = SEARCH_PROVIDERS if providers is None else providers
+    key = normalize_query(query)
+    if not key:
+        return []
+    cache_key = (key, tuple(providers))
+    cached = search_cache.get(cache_key)
+    if cached is not None:
+        return [dict(result) for result in cached]
+
+    pool = get_pool()
+    futures = [pool.submit(provider, key) for provider in providers.values()]
+    done, late = wait(futures, timeout=deadline)
+    result_lists, failed = [], 0
+    for future in futures:
+        if future in done and future.exception() is None:
+            result_lists.append(future.result())
+        elif future in done:
+            failed += 1
+    # Sessions search from their own threads
+    with _totals_lock:
+        search_totals["searches"] += 1
+        search_totals["timeouts"] += len(late)
+        search_totals["errors"] += failed
+
+    results = merge_results(result_lists)
+    if results and not late and not failed:
+        search_cache.set(cache_key, results)
+    return [dict(result) for result in results]
@@ -0,0 +1,55 @@
+import os
+import re
+from urllib.parse import urlparse, parse_qs
+from youtube_transcript_api import YouTubeTranscriptApi  # For YouTube transcripts
+from ttl_cache import TTLCache
+
+# --- YouTube Cache Settings ---
+YOUTUBE_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".chatbot_youtube_cache.db")
+TRANSCRIPT_TTL = 7 * 24 * 60 * 60   # Seconds a fetched transcript is reused
+SUMMARY_TTL = 7 * 24 * 60 * 60      # Seconds a generated summary is reused
+SUMMARY_VERSION = 1                 # Bump when the summarization prompts change
+
+# --- Process-wide Transcript and Summary Store (shared by Astra and Vertex) ---
+youtube_cache = TTLCache(max_entries=64, ttl=TRANSCRIPT_TTL, db_path=YOUTUBE_CACHE_PATH)
+
+VIDEO_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{11}$")
+YOUTUBE_HOSTS = {"youtube.com", "www.youtube.com", "m.youtube.com", "music.youtube.com", "youtube-nocookie.com", "www.youtube-nocookie.com"}
+
+def extract_youtube_id(url):
+    """Extracts the YouTube video ID from a URL (or a bare ID); None if there isn't one."""
+    url = url.strip()
+    if VIDEO_ID_PATTERN.match(url):
+        return url
+    if "://" not in url:
+        url = "https://" + url
+    parsed_url = urlparse(url)
+    hostname = (parsed_url.hostname or "").lower()
+    video_id = None
+    if hostname == "youtu.be":
+        video_id = parsed_url.path[1:].split("/")[0]
+    elif hostname in YOUTUBE_HOSTS:
+        if parsed_url.path == "/watch":
+            video_id = parse_qs(parsed_url.query).get("v", [None])[0]
+        else:
+            parts = parsed_url.path.split("/")
+            if len(parts) > 2 and parts[1] in ("embed", "v", "shorts", "live"):
+                video_id = parts[2]
+    if video_id and VIDEO_ID_PATTERN.match(video_id):
+        return video_id
+    return None
+
+def fetch_transcript(video_id):
+    """Returns the transcript segments ({"text", "start", "duration"}), fetching at most once per TTL."""
+    key = f"transcript:{video_id}"
+    segments = youtube_cache.get(key)
+    if segments is None:
+        segments = YouTubeTranscriptApi.get_transcript(video_id)
+        youtube_cache.set(key, segments)
+    return segments
+
+def get_cached_summary(video_id):
+    return youtube_cache.get(f"summary:v{SUMMARY_VERSION}:{video_id}")
+
+def cache_summary(video_id, summary):
+    youtube_cache.set(f"summary:v{SUMMARY_VERSION}:{video_id}", summary, ttl=SUMMARY_TTL)